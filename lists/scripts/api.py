@@ -0,0 +1,112 @@
+"""
+Importable API over the list scripts.
+
+Importing this module has no side effects (no logging setup, no argument
+parsing) and pulls in nothing beyond the standard library; aiohttp,
+tldextract and friends are loaded on the first call that needs them.
+"""
+from typing import Dict, Iterable, List, Tuple
+
+
+__all__ = ["dedup", "parse", "aggregate", "sort_entries", "resolve", "cidrs"]
+
+
+def dedup(hosts: Iterable[str], only_main: bool = False) -> List[str]:
+    """
+    Removes duplicates and blank lines from a hostlist, keeping the first occurrence order.
+
+    :param hosts: Hostnames.
+    :type hosts: Iterable[str]
+    :param only_main: Reduce every hostname to its main domain first (loads tldextract).
+    :type only_main: bool
+    :return: Unique hostnames.
+    :rtype: List[str]
+    """
+    hosts = [host.strip() for host in hosts if host.strip()]
+
+    if only_main:
+        from remove_dup_hosts import only_main_dom
+        hosts = only_main_dom(hosts)
+
+    return list(dict.fromkeys(hosts))
+
+
+def parse(log: str, ipv_mode: str = "3", testmode: str = "nslookup") -> Tuple[List[str], List[str]]:
+    """
+    Extracts IPs from nslookup / dig / DoH output.
+
+    :param log: Raw tool output.
+    :type log: str
+    :param ipv_mode: 1 = IPv4, 2 = IPv6, 3 = both.
+    :type ipv_mode: str
+    :param testmode: nslookup, dig or curl.
+    :type testmode: str
+    :return: IPv4 and IPv6 lists (empty when nothing was found).
+    :rtype: Tuple[List[str], List[str]]
+    """
+    from get_ipsets import separate_ips
+
+    result = separate_ips(log, ipv_mode, testmode)
+    return result if result else ([], [])
+
+
+def aggregate(entries: Iterable[str]) -> List[str]:
+    """
+    Collapses IPs and CIDRs into the minimal set of covering prefixes.
+
+    :param entries: IPs or CIDRs, v4 and v6 mixed.
+    :type entries: Iterable[str]
+    :return: Prefixes, IPv4 first, each family in address order.
+    :rtype: List[str]
+    """
+    from prefixset import PrefixSet
+    return list(PrefixSet(entry for entry in entries if entry.strip()).collapse().lines())
+
+
+def sort_entries(entries: Iterable[str]) -> List[str]:
+    """
+    Sorts IPs / CIDRs the way the ipset files are sorted: IPv4 first, then by address and prefix length.
+    """
+    from get_ipsets import sort_ips
+    return sort_ips(set(entry.strip() for entry in entries if entry.strip()))
+
+
+def resolve(domains: Iterable[str], ipv_mode: str = "3", concurrency: int = 50, timeout: float = 5.0) -> Dict[str, Tuple[List[str], List[str]]]:
+    """
+    Resolves domains in-process with the async resolver.
+
+    :param domains: Domains to resolve.
+    :type domains: Iterable[str]
+    :param ipv_mode: 1 = IPv4, 2 = IPv6, 3 = both.
+    :type ipv_mode: str
+    :return: domain -> (IPv4 list, IPv6 list).
+    :rtype: Dict[str, Tuple[List[str], List[str]]]
+    """
+    import asyncio
+    from resolver import Resolver
+
+    domains = dedup(domains)
+
+    async def run() -> Dict[str, Tuple[List[str], List[str]]]:
+        resolver = Resolver(ipv_mode, concurrency, timeout)
+        answers = await asyncio.gather(*(resolver.resolve(domain) for domain in domains))
+        return dict(zip(domains, answers))
+
+    return asyncio.run(run())
+
+
+def cidrs(ips: Iterable[str], cache: bool = False) -> List[str]:
+    """
+    Looks up the RDAP networks of the given IPs (loads aiohttp).
+
+    :param ips: IP addresses.
+    :type ips: Iterable[str]
+    :param cache: Use the on-disk CIDR cache.
+    :type cache: bool
+    :return: Sorted CIDRs.
+    :rtype: List[str]
+    """
+    import asyncio
+    from get_ipsets import get_cidrs, sort_ips
+
+    return sort_ips(asyncio.run(get_cidrs(list(ips), cache)))
@@ -0,0 +1,242 @@
+import os, re, glob, gzip, math, logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, TYPE_CHECKING
+from service import Service
+
+if TYPE_CHECKING:
+    from profile_compiler import Profile
+
+
+TEST_RE = re.compile(r"^- (curl_test_\w+) ipv(\d) (\S+) : (\S+) ?(.*)$")
+SUMMARY_RE = re.compile(r"^(curl_test_\w+) ipv(\d) (\S+) : (\S+) ?(.*)$")
+
+PROTOCOLS = {
+    "curl_test_http": "http",
+    "curl_test_https_tls12": "tls12",
+    "curl_test_https_tls13": "tls13",
+    "curl_test_http3": "quic",
+}
+
+PROTOCOL_FILTERS = {
+    "http": ("--filter-tcp", "80"),
+    "tls12": ("--filter-tcp", "443"),
+    "tls13": ("--filter-tcp", "443"),
+    "quic": ("--filter-udp", "443"),
+}
+
+DAEMONS = {"winws", "nfqws", "dvtws", "tpws"}
+
+SUCCESS_MARKERS = ("!!!!! AVAILABLE !!!!!", "SUCCESS")
+FAILURE_MARKERS = ("UNAVAILABLE", "FAILED")
+
+
+class Stats:
+    """
+    Success counters of one strategy for one protocol.
+    """
+    __slots__ = ("success", "total", "domains_ok", "domains_seen", "summary_hits")
+
+
+    def __init__(self) -> None:
+        self.success = 0
+        self.total = 0
+        self.domains_ok: Set[str] = set()
+        self.domains_seen: Set[str] = set()
+        self.summary_hits = 0
+
+
+    def rate(self) -> float:
+        return self.success / self.total if self.total else 0.0
+
+
+    def score(self, z: float = 1.96) -> float:
+        """
+        Lower bound of the Wilson interval: favours strategies tested often over lucky one-offs.
+        """
+        if not self.total:
+            return 0.0
+        p, n = self.rate(), self.total
+        centre = p + z * z / (2 * n)
+        margin = z * math.sqrt((p * (1 - p) + z * z / (4 * n)) / n)
+        return (centre - margin) / (1 + z * z / n)
+
+
+def normalize_strategy(args: str) -> str:
+    """
+    Drops interception-only args (--wf-*, --qnum, ...) so the same strategy matches across machines.
+    """
+    return " ".join(arg for arg in args.split() if not arg.startswith(("--wf-", "--qnum", "--port", "--user", "--ipset", "--hostlist")))
+
+
+def open_log(path: str) -> Iterator[str]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def analyze(paths: Iterable[str]) -> Dict[Tuple[str, str], Stats]:
+    """
+    Function, that stream-parses blockcheck logs and aggregates results per (protocol, strategy).
+
+    Memory depends on the number of distinct strategies and domains, not on log size.
+
+    :param paths: blockcheck.log files (optionally .gz).
+    :type paths: Iterable[str]
+    :return: (protocol, strategy) -> Stats.
+    :rtype: Dict[Tuple[str, str], Stats]
+    """
+    stats: Dict[Tuple[str, str], Stats] = {}
+
+    for path in paths:
+        current: Optional[Tuple[str, str, str]] = None
+        in_summary = False
+        tests = 0
+
+        for line in open_log(path):
+            if not line:
+                continue
+
+            if line.startswith("- "):
+                in_summary = False
+                match = TEST_RE.match(line)
+                if match and match.group(4) in DAEMONS:
+                    protocol = PROTOCOLS.get(match.group(1), match.group(1))
+                    current = (protocol, normalize_strategy(match.group(5)), match.group(3))
+                continue
+
+            if in_summary:
+                match = SUMMARY_RE.match(line)
+                if match and match.group(4) in DAEMONS and match.group(5) and match.group(5) != "not working":
+                    protocol = PROTOCOLS.get(match.group(1), match.group(1))
+                    key = (protocol, normalize_strategy(match.group(5)))
+                    stats.setdefault(key, Stats()).summary_hits += 1
+                continue
+
+            if line == "* SUMMARY":
+                in_summary = True
+                current = None
+                continue
+
+            if current is None:
+                continue
+
+            if line.startswith(SUCCESS_MARKERS):
+                ok = True
+            elif line.startswith(FAILURE_MARKERS):
+                ok = False
+            else:
+                continue
+
+            protocol, strategy, domain = current
+            entry = stats.setdefault((protocol, strategy), Stats())
+            entry.total += 1
+            entry.domains_seen.add(domain)
+            if ok:
+                entry.success += 1
+                entry.domains_ok.add(domain)
+            current = None
+            tests += 1
+
+        logging.info(f"{path}: {tests} test result(s).")
+
+    return stats
+
+
+def rank(stats: Dict[Tuple[str, str], Stats], top: int = 5) -> Dict[str, List[Tuple[str, Stats]]]:
+    """
+    Best strategies per protocol: by number of working domains, then Wilson score.
+    Strategies that were never tested (no_bypass / not-working placeholders) are skipped.
+    """
+    by_protocol: Dict[str, List[Tuple[str, Stats]]] = {}
+    for (protocol, strategy), entry in stats.items():
+        if strategy and entry.success:
+            by_protocol.setdefault(protocol, []).append((strategy, entry))
+
+    return {
+        protocol: sorted(items, key=lambda item: (len(item[1].domains_ok), item[1].score()), reverse=True)[:top]
+        for protocol, items in sorted(by_protocol.items())
+    }
+
+
+def strategy_tokens(args: Iterable[Tuple[str, Optional[str]]]) -> Set[str]:
+    tokens = set()
+    for name, value in args:
+        if not name.startswith("--dpi-desync") and not name.startswith("--orig"):
+            continue
+        if value and ("/" in value or "\\" in value or value.endswith(".bin")):
+            value = "<file>"
+        tokens.add(name)
+        tokens.add(f"{name}={value}" if value is not None else name)
+    return tokens
+
+
+def load_profiles(directory: str) -> List["Profile"]:
+    from profile_compiler import parse_profile
+
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.bat"))):
+        try:
+            profiles.append(parse_profile(path))
+        except (ValueError, OSError):
+            continue
+    return profiles
+
+
+def closest_profiles(strategy: str, protocol: str, profiles: List["Profile"], limit: int = 3) -> List[Tuple[float, str, int]]:
+    """
+    Function, that finds profile sections whose desync args are most similar (Jaccard) to a strategy.
+
+    :return: (similarity, profile name, section index), best first.
+    :rtype: List[Tuple[float, str, int]]
+    """
+    wanted = strategy_tokens(
+        (name, value if sep else None)
+        for name, sep, value in (arg.partition("=") for arg in strategy.split())
+    )
+    filter_name, port = PROTOCOL_FILTERS.get(protocol, (None, None))
+    matches = []
+
+    for profile in profiles:
+        for section in profile.sections:
+            if filter_name and not any(
+                name == filter_name and port in (value or "").split(",") for name, value in section.filters
+            ):
+                continue
+            tokens = strategy_tokens(section.args)
+            if not tokens:
+                continue
+            similarity = len(wanted & tokens) / len(wanted | tokens)
+            matches.append((similarity, profile.name, section.index))
+
+    return sorted(matches, key=lambda m: m[0], reverse=True)[:limit]
+
+
+def main() -> None:
+    service = Service("blockcheck")
+    Service.setup_logging()
+    args = service.argparse().parse_args()
+
+    paths = [path for pattern in args.logs for path in (glob.glob(pattern) or [pattern])]
+    stats = analyze(paths)
+    profiles_dir = args.profiles
+    if profiles_dir is None:
+        try:
+            profiles_dir = os.path.dirname(Service.find_file("service.bat"))
+        except FileNotFoundError:
+            logging.warning("Profiles directory not found, skipping profile mapping.")
+    profiles = load_profiles(profiles_dir) if profiles_dir else []
+
+    for protocol, items in rank(stats, args.top).items():
+        logging.info(f"== {protocol} ==")
+        for strategy, entry in items:
+            logging.info(
+                f"{len(entry.domains_ok)}/{len(entry.domains_seen)} domains, "
+                f"{entry.success}/{entry.total} tests ({entry.rate():.0%}), "
+                f"in summary {entry.summary_hits}x : {strategy}"
+            )
+            for similarity, name, index in closest_profiles(strategy, protocol, profiles):
+                logging.info(f"    ~{similarity:.0%} {name} [section {index}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,88 +1,212 @@
-import time, logging
-import requests
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.common.exceptions import WebDriverException
+import os, time, logging, queue
 from typing import List, Any, Optional, Dict
 from service import Service
 
 
-service = Service("domains")
-logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+# Browsers keep only 250 resource timing entries by default, so past that
+# getEntriesByType('resource') stops growing. The observer sees every entry
+# regardless of the buffer; injected at document start where the driver supports
+# it (Chromium CDP), otherwise on the first poll, picking up the buffered ones.
+RESOURCE_BUFFER_SIZE = 10000
+
+TRACK_RESOURCES_JS = """
+    (() => {
+        if (window.__resourceHosts) return;
+        const hosts = window.__resourceHosts = new Set();
+        window.__resourceCount = 0;
+        window.__resourceObserved = false;
+        window.__resourceBufferSize = 250;
+        const add = entries => {
+            for (const entry of entries) {
+                window.__resourceCount++;
+                try { hosts.add((new URL(entry.name)).hostname); }
+                catch (e) {}
+            }
+        };
+        try {
+            performance.setResourceTimingBufferSize(%d);
+            window.__resourceBufferSize = %d;
+        }
+        catch (e) {}
+        try {
+            new PerformanceObserver(list => add(list.getEntries())).observe({type: 'resource', buffered: true});
+            window.__resourceObserved = true;
+        }
+        catch (e) {}
+    })();
+""" % (RESOURCE_BUFFER_SIZE, RESOURCE_BUFFER_SIZE)
+
+RESOURCES_COUNT_JS = TRACK_RESOURCES_JS + """
+    const buffered = performance.getEntriesByType('resource').length;
+    if (window.__resourceObserved) return [window.__resourceCount, false];
+    return [buffered, buffered >= window.__resourceBufferSize];
+"""
+
+RESOURCES_DOMAINS_JS = TRACK_RESOURCES_JS + """
+    const domainSet = new Set(window.__resourceHosts);
+    for (const r of performance.getEntriesByType('resource')) {
+        try { domainSet.add((new URL(r.name)).hostname); }
+        catch (e) {}
+    }
+    domainSet.delete('');
+    return Array.from(domainSet);
+"""
 
 
-def get_response(browser: str) -> List[str]:
-    browser_options = Options()
-    all_domains = []
+def track_resources(driver: Any) -> None:
+    """
+    Installs the resource observer in every new document, on drivers that support CDP.
+    """
+    from selenium.common.exceptions import WebDriverException
+
+    if not hasattr(driver, "execute_cdp_cmd"):
+        return
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": TRACK_RESOURCES_JS})
+    except WebDriverException as e:
+        logging.debug(f"Could not inject the resource observer: {e}")
+
+
+def wait_network_quiet(driver: Any, quiet: float, timeout: float, poll: float = 0.25) -> None:
+    """
+    Blocks until the number of resource entries stops growing. A count stuck at a full
+    timing buffer (no observer available) never counts as quiet, only the timeout ends it.
+
+    :param driver: WebDriver instance with a loaded page.
+    :param quiet: Seconds without new resource entries to consider the page idle.
+    :type quiet: float
+    :param timeout: Hard cap (seconds) for a single host.
+    :type timeout: float
+    :param poll: Polling interval in seconds.
+    :type poll: float
+    """
+    deadline = time.monotonic() + timeout
+    last_count = -1
+    last_change = time.monotonic()
+
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            logging.debug("Network quiet timeout reached.")
+            return
+
+        count, buffer_full = driver.execute_script(RESOURCES_COUNT_JS)
+        if count != last_count or buffer_full:
+            last_count = count
+            last_change = now
+        elif now - last_change >= quiet:
+            return
+
+        time.sleep(min(poll, max(deadline - now, 0)))
+
+
+def crawl_host(driver: Any, host: str, quiet: float, timeout: float) -> List[str]:
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    url = host if "://" in host else f"https://{host}"
+    logging.info(f"Visiting {url}...")
+    driver.get(url)
+
+    WebDriverWait(driver, 10).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+    wait_network_quiet(driver, quiet, timeout)
+
+    domains = driver.execute_script(RESOURCES_DOMAINS_JS)
+    logging.info(f"Found domains on {host}: {domains}")
+    return domains
+
+
+def get_response(browser: str, hosts: List[str], workers: int = 4, quiet: float = 2.0, timeout: float = 15.0) -> List[str]:
+    """
+    Visits hosts with a pool of WebDriver sessions and collects resource hostnames.
+
+    :param browser: Browser mode (chrome, firefox, edge).
+    :type browser: str
+    :param hosts: Hosts (or URLs) to visit.
+    :type hosts: List[str]
+    :param workers: Number of parallel browser sessions.
+    :type workers: int
+    :param quiet: Seconds without new resource entries before a page is considered loaded.
+    :type quiet: float
+    :param timeout: Per-host cap (seconds) for waiting on network quiet.
+    :type timeout: float
+    :return: Sorted unique hostnames.
+    :rtype: List[str]
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    from selenium.webdriver.chrome.options import Options
+    from selenium.common.exceptions import WebDriverException
+
     config = setup_browser(browser)
     
-    if not config:
+    if not config or not hosts:
         return []
 
 
     driver_class = config["driver"]
-    args = config["args"]
-
-
-    for arg in args:
-        browser_options.add_argument(arg)
+    args = list(config["args"])
 
 
     user_agent = get_user_agent("https://www.iana.org")
     if user_agent:
-        browser_options.add_argument(f"user-agent={user_agent}")
+        args.append(f"user-agent={user_agent}")
 
 
-    HOSTS = input("Enter the host(s), separated by space (without protocol): ").split()
+    host_queue: "queue.Queue[str]" = queue.Queue()
+    for host in hosts:
+        host_queue.put(host)
 
 
-    driver = driver_class(options=browser_options)
+    def worker() -> List[str]:
+        browser_options = Options()
+        for arg in args:
+            browser_options.add_argument(arg)
 
-    try:
-        for host in HOSTS:
-            url = f"https://{host}"
-            try:
-                logging.info(f"\nVisiting {url}...")
-                driver.get(url)
+        found = []
+        driver = driver_class(options=browser_options)
 
-                WebDriverWait(driver, 10).until(
-                    lambda d: d.execute_script("return document.readyState") == "complete"
-                )
+        try:
+            track_resources(driver)
+            while True:
+                try:
+                    host = host_queue.get_nowait()
+                except queue.Empty:
+                    break
 
-                time.sleep(15)  
+                try:
+                    found.extend(crawl_host(driver, host, quiet, timeout))
+                except WebDriverException as e:
+                    logging.exception(f"Failed to load {host}: {e}", exc_info=True)
+        finally:
+            driver.quit()
 
-                domains = driver.execute_script("""
-                    const resources = performance.getEntriesByType('resource');
-                    const domainSet = new Set(
-                        resources.map(r => {
-                            try { return (new URL(r.name)).hostname; } 
-                            catch (e) { return null; }
-                        }).filter(Boolean)
-                    );
-                    return Array.from(domainSet);
-                """)
+        return found
 
-                logging.info(f"Found domains on {host}: {domains}")
-                all_domains.extend(domains)
 
-            except WebDriverException as e:
-                logging.exception(f"Failed to load {url}: {e}", exc_info=True)
+    all_domains = []
+    pool_size = max(1, min(workers, len(hosts)))
 
-    finally:
-        unique_domains = sorted(set(all_domains))
-        driver.quit()
+    with ThreadPoolExecutor(max_workers=pool_size) as executor:
+        futures = [executor.submit(worker) for _ in range(pool_size)]
+        for future in as_completed(futures):
+            try:
+                all_domains.extend(future.result())
+            except WebDriverException as e:
+                logging.exception(f"Browser session failed: {e}", exc_info=True)
 
-    logging.info(f"\nTotal unique domains found: {len(unique_domains)}")
+    unique_domains = sorted(set(all_domains))
+    logging.info(f"Total unique domains found: {len(unique_domains)}")
     return unique_domains
 
 
 
 def get_hosts(filename) -> List[str]:
-    path = service.find_file(filename)
+    path = Service.find_file(filename)
 
     with open(path, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f.readlines()]
+        lines = [line.strip() for line in f.readlines() if line.strip()]
     
     if len(lines) > 0:
         return lines
@@ -92,6 +216,7 @@ def get_hosts(filename) -> List[str]:
 
 
 def get_user_agent(url) -> str:
+    import requests
     try:
         response = requests.get(url)
         response.raise_for_status()  
@@ -102,6 +227,8 @@ def get_user_agent(url) -> str:
 
 
 def setup_browser(browser: str) -> Optional[Dict[str, Any]]:
+    from selenium import webdriver
+
     browser_configs = {
         "chrome": {
             "driver": webdriver.Chrome,
@@ -136,11 +263,51 @@ def r2txt(domains: List[str]) -> None:
             f.write(domain + " ")
 
 
+@Service.log_file_change
+def r2hostlist(file_path: str, domains: List[str]) -> None:
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+
+    existing = {line.strip() for line in content.splitlines() if line.strip()}
+    new_domains = [domain for domain in domains if domain not in existing]
+
+    with open(file_path, "a", encoding="utf-8") as f:
+        if new_domains and content and not content.endswith("\n"):
+            f.write("\n")
+        for domain in new_domains:
+            f.write(domain + "\n")
+
+
 def main() -> None:
+    service = Service("domains")
+    Service.setup_logging()
     args = service.argparse().parse_args()
-    domains = get_response(args.browser)
-    r2txt(domains)
-    logging.info("\nSaved to bc-args-list.txt")
+
+    if args.har_files:
+        from har_import import import_hosts
+        domains = import_hosts(args.har_files)
+
+    else:
+        if args.filename:
+            hosts = get_hosts(args.filename)
+        else:
+            hosts = input("Enter the host(s), separated by space (without protocol): ").split()
+
+        if args.engine == "http":
+            import asyncio
+            from http_crawler import crawl
+            domains = asyncio.run(crawl(hosts, args.depth, args.workers, args.timeout))
+        else:
+            domains = get_response(args.browser, hosts, args.workers, args.quiet, args.timeout)
+
+    if args.output:
+        if not os.path.isfile(args.output):
+            open(args.output, "w", encoding="utf-8").close()
+        r2hostlist(args.output, domains)
+        logging.info(f"Merged into {args.output}")
+    else:
+        r2txt(domains)
+        logging.info("\nSaved to bc-args-list.txt")
     
 
 
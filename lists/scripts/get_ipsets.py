@@ -1,22 +1,27 @@
 import os
-import subprocess, logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import asyncio, aiohttp
+import logging
 import json
-import ipaddress, psutil, socket
-from typing import Tuple, List, Optional, Set, Union
+import ipaddress
+from itertools import chain
+from typing import Iterable, Tuple, List, Optional, Set, Union, TYPE_CHECKING
 from service import Service
+from prefixset import PrefixSet, parse_prefix, read_prefix_file
+
+if TYPE_CHECKING:
+    import aiohttp
 
 
 
 
 CIDR_CACHE_FILE = "cidr_cache.json"
-service = Service("ipset")
-logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
+CIDR_JOURNAL_FILE = "cidr_journal.jsonl"
+# RDAP answers that will not change on retry, e.g. 404 for addresses outside RIPE's region
+PERMANENT_RDAP_STATUSES = {400, 404}
 
 
 
 def run_proc(cmd: List[str]) -> str:
+    import subprocess
     try:
         res = subprocess.run(cmd, capture_output=True, text=True)
         return res.stdout if res.returncode == 0 else ""
@@ -41,7 +46,7 @@ def resolve_domains(domain_file: str, os_type: str, ipv_mode: str, testmode: str
     :rtype: Tuple[str | None, str | None]
     """
     try:
-        domain_list_path = service.find_file(domain_file)
+        domain_list_path = Service.find_file(domain_file)
     except FileNotFoundError as e:
         logging.error("File not found!", exc_info=True)
         return None, None
@@ -103,6 +108,8 @@ def resolve_domains(domain_file: str, os_type: str, ipv_mode: str, testmode: str
                         return None, None
 
 
+            from concurrent.futures import ThreadPoolExecutor, as_completed
+
             output = ""
             with ThreadPoolExecutor(max_workers=10) as executor:
                 futures = [executor.submit(run_proc, cmd) for cmd in cmds]
@@ -124,149 +131,239 @@ def load_cache_from_disk() -> dict[str, List[str]]:
 
 
 def save_cache_to_disk(cache: dict[str, List[str]]):
-    flag = "a" if os.path.exists(f"./{CIDR_CACHE_FILE}") else "w"
-    with open(CIDR_CACHE_FILE, mode = flag, encoding="utf-8") as f:
-        json.dump(cache, f, indent=2)
+    Service.write_atomic(CIDR_CACHE_FILE, [json.dumps(cache, indent=2)])
 
 
-async def get_cidrs(ips: List[str], cache_flag: bool) -> Set[str]:
+async def fetch_cidrs(ip: str, session: "aiohttp.ClientSession", cache: Optional[dict[str, List[str]]] = None) -> List[str]:
+    """
+    Function, that looks up the CIDRs of the network an ip belongs to in RIPE RDAP.
+
+    :param ip: Ip to look up in RDAP
+    :type ip: str
+    :param session: Shared aiohttp session
+    :type session: aiohttp.ClientSession
+    :param cache: CIDR cache to read from and fill, or None
+    :type cache: dict[str, List[str]] | None
+    :return: CIDRs of the network the ip belongs to. Answered lookups (also empty ones, like
+             HTTP 404) are stored in cache; a missing cache key means a temporary failure.
+    :rtype: List[str]
     """
-    Docstring for get_cidrs
+    key = f"cidr:{ip}"
     
-    :param ips: List of ips to merge
+    if cache is not None and key in cache:
+        logging.debug(f"[CACHE] CIDRs for {ip} found and executed.")
+        return cache[key]
+    
+    url = f"https://rdap.db.ripe.net/ip/{ip}"
+    try:
+        async with session.get(url, timeout=10) as response:
+            if response.status in PERMANENT_RDAP_STATUSES:
+                logging.debug(f"No RDAP record for {ip}: HTTP {response.status}")
+                if cache is not None:
+                    cache[key] = []
+                return []
+
+            if response.status != 200:
+                logging.warning(f"Failed to fetch CIDR for {ip}: HTTP {response.status}")
+                return []
+
+            data = await response.json()
+            cidr_entries = data.get("cidr0_cidrs", [])
+            cidrs = [f"{entry['v4prefix']}/{entry['length']}" for entry in cidr_entries if 'v4prefix' in entry] + \
+                     [f"{entry['v6prefix']}/{entry['length']}" for entry in cidr_entries if 'v6prefix' in entry]
+            
+            if cache is not None:
+                cache[key] = cidrs
+
+            return cidrs
+        
+    except Exception as e:
+        logging.error(f"Error fetching CIDR for {ip}: {e}", exc_info=True)
+        return []
+
+
+def replay_journal(journal_path: str = CIDR_JOURNAL_FILE) -> dict[str, List[str]]:
+    """
+    Reads the results journaled by an interrupted get_cidrs run. A torn last line is ignored.
+    """
+    done = {}
+    if not os.path.exists(journal_path):
+        return done
+
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                done[record["ip"]] = record["cidrs"]
+            except (ValueError, KeyError, TypeError):
+                logging.debug(f"Skipping damaged journal line: {line.strip()}")
+    return done
+
+
+async def get_cidrs(ips: List[str], cache_flag: bool, resume: bool = False, journal_path: str = CIDR_JOURNAL_FILE) -> Set[str]:
+    """
+    Function, that looks up the RDAP networks of all ips concurrently and merges their CIDRs.
+
+    Every answered lookup is appended to a JSON lines journal ({"ip": ..., "cidrs": [...]})
+    as soon as it arrives, empty answers (HTTP 404 outside RIPE's region) included.
+    A run stopped by Ctrl-C or a network drop keeps its journal; --resume (resume=True)
+    reuses the journaled results and looks up only the rest, so temporary failures are
+    retried and nothing is fetched twice. The journal is removed once no lookup failed.
+
+    :param ips: IPs to look up
     :type ips: List[str]
-    :param cache_flag: Cache or no cache
+    :param cache_flag: Read and update the on-disk CIDR cache
     :type cache_flag: bool
-    :return: Merged ips/cidrs
+    :param resume: Append to the journal of an earlier run and skip the IPs already in it
+    :type resume: bool
+    :param journal_path: Journal file
+    :type journal_path: str
+    :return: CIDRs of all answered lookups
     :rtype: Set[str]
     """
-    results = []
+    import asyncio, aiohttp
 
-    if cache_flag:
-        cache = load_cache_from_disk()   
-    else:
-        cache = None
+    done = replay_journal(journal_path) if resume else {}
+    results = {cidr for ip in ips for cidr in done.get(ip, [])}
+    todo = [ip for ip in ips if ip not in done]
+    if resume:
+        logging.info(f"Resuming: {len(ips) - len(todo)} of {len(ips)} IP(s) already done.")
 
-    async def fetch(ip: str, session: aiohttp.ClientSession) -> List[str]:
-        key = f"cidr:{ip}"
-        
-        if cache and key in cache:
-            logging.debug(f"[CACHE] CIDRs for {ip} found and executed.")
-            return json.loads(cache[key])
-        
-        url = f"https://rdap.db.ripe.net/ip/{ip}"
-        try:
-            async with session.get(url, timeout=10) as response:
-                if response.status != 200:
-                    logging.warning(f"Failed to fetch CIDR for {ip}: HTTP {response.status}")
-                    return []
-
-                data = await response.json()
-                cidr_entries = data.get("cidr0_cidrs", [])
-                cidrs = [f"{entry['v4prefix']}/{entry['length']}" for entry in cidr_entries if 'v4prefix' in entry] + \
-                         [f"{entry['v6prefix']}/{entry['length']}" for entry in cidr_entries if 'v6prefix' in entry]
-                
-                if cache_flag:
-                    if key not in cache:
-                        cache[key] = cidrs
+    # without the on-disk cache a per-run one still tells answered lookups from failed ones
+    cache = load_cache_from_disk() if cache_flag else {}
 
-                return cidrs
-            
-        except Exception as e:
-            logging.error(f"Error fetching CIDR for {ip}: {e}", exc_info=True)
-            return []
+    journal = open(journal_path, "a" if resume else "w", encoding="utf-8")
+    completed, failed = 0, 0
 
     async with aiohttp.ClientSession() as session:
-        tasks = [fetch(ip, session) for ip in ips]
-        cidr_lists = await asyncio.gather(*tasks)
-        for cidrs in cidr_lists:
-            for cidr in cidrs:
-                results.append(cidr)
-
-    if cache_flag:
-        save_cache_to_disk(cache)
-    
-    return set(results)
+        async def lookup(ip: str) -> Tuple[str, List[str]]:
+            return ip, await fetch_cidrs(ip, session, cache)
 
+        tasks = [asyncio.create_task(lookup(ip)) for ip in todo]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                ip, cidrs = await next_done
+                results.update(cidrs)
+                if f"cidr:{ip}" in cache:
+                    journal.write(json.dumps({"ip": ip, "cidrs": cidrs}) + "\n")
+                    journal.flush()
+                else:
+                    failed += 1
+                completed += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+            os.fsync(journal.fileno())
+            journal.close()
+            if cache_flag:
+                save_cache_to_disk(cache)
+            if completed < len(todo):
+                logging.warning(
+                    f"Stopped after {completed} of {len(todo)} lookup(s); "
+                    f"results are kept in {journal_path}, rerun with --resume to continue."
+                )
+
+    if failed:
+        logging.warning(f"{failed} lookup(s) failed; rerun with --resume to retry only those.")
+    else:
+        os.remove(journal_path)
+    return results
 
-# def get_port(port: int) -> Optional[List[str]]:
-#     """
-#     Docstring for get_port
-    
-#     :param port: Description
-#     :type port: int
-#     :return: Description
-#     :rtype: List[str] | None
-#     """
-#     result = set()
-#     try:
-#         for conn in psutil.net_connections(kind='inet'):
-#             if conn.raddr and conn.status == psutil.CONN_ESTABLISHED:
-#                 if conn.raddr[1] == port:
-#                     result.add(conn.raddr[0])
-#     except Exception as e:
-#         logging.error(f"Error getting port connections: {e}", exc_info=True)
-#         return None
-#     return list(result)
-
-
-# def ip2host(ips: List[str], filename: str = "port_connections.txt") -> None:
-#     """
-#     Function that allows to find out which ip uses which port
-    
-#     :param ips: List of ips.
-#     :type ips: List[str]
-#     :param filename: Name of the file where the ports will be saved.
-#     :type filename: str
-#     :return: None
-#     :rtype: str | None
-#     """
-#     seen = set()
-#     output_lines = []
-
-#     for ip in ips:
-#         try:
-#             domain = socket.gethostbyaddr(ip)[0]
-#             logging.info(f"{ip} resolved to {domain}")
-#         except Exception:
-#             domain = None
-#             logging.debug(f"Could not resolve {ip}")
-
-#         line = f"{domain} : {ip}" if domain else f'{ip}'
-#         if line not in seen:
-#             seen.add(line)
-#             output_lines.append(line)
-
-#     if output_lines:
-#         with open(filename, "a", encoding="utf-8") as f:
-#             for line in output_lines:
-#                 f.write(line + "\n")
-
-#         logging.info(f"Saved {len(output_lines)} connection(s) to {filename}")
-#     else:
-#         logging.info("No new connections to save.")
-
-
-@service.log_file_change
+
+@Service.log_file_change
 def remove_duplicates(filepath: str) -> None:
-    with open(filepath, "r", encoding="utf-8") as f:
-        lines = f.read().splitlines()
+    entries, bare_hosts, kept = read_prefix_file(filepath)
+    Service.write_atomic(filepath, chain(kept, entries.lines(bool(bare_hosts))))
+
+
+def output_path(domain_list_path: str, kind: str, version: int) -> str:
+    """
+    Builds the output filename next to the hostlist, e.g. 'ipset-ipv4-<hostlist>'.
 
-    unique = set(line.strip() for line in lines if line.strip())
-    sorted_unique = sort_ips(unique)
+    :param kind: 'ips' or 'ipset'
+    :type kind: str
+    :param version: 4 or 6
+    :type version: int
+    """
+    return os.path.join(
+        os.path.dirname(domain_list_path),
+        f"{kind}-ipv{version}-{os.path.basename(domain_list_path)}"
+    )
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        for line in sorted_unique:
-            f.write(line + "\n")
 
+def save_entries(entries: Union[PrefixSet, Iterable[str]], output_file: str, bare_hosts: bool = False, skip_covered: bool = False) -> int:
+    """
+    Function, that merges entries into an ipset / ips-* file and writes it once, sorted and unique.
+    Comments and lines that are not plain entries are kept verbatim at the top of the file.
+
+    :param entries: IPs / CIDRs to add.
+    :type entries: PrefixSet | Iterable[str]
+    :param output_file: File to merge into, created if missing.
+    :type output_file: str
+    :param bare_hosts: Write single addresses without '/32' in a new file; an existing file keeps its style.
+    :type bare_hosts: bool
+    :param skip_covered: Do not add entries already covered by a wider prefix in the file.
+    :type skip_covered: bool
+    :return: Number of entries added.
+    :rtype: int
+    """
+    new = entries if isinstance(entries, PrefixSet) else PrefixSet(entries)
+    existing, style, kept = read_prefix_file(output_file) if os.path.exists(output_file) else (PrefixSet(), None, [])
 
-def sort_ips(array: set[str]) -> List[str]:
-    def parse(cidr: str) -> Tuple[int, int, int]:
-        net = ipaddress.ip_network(cidr, strict=False)
+    if skip_covered:
+        new = PrefixSet(entry for entry in new if entry not in existing)
+
+    merged = existing | new
+    Service.write_atomic(output_file, chain(kept, merged.lines(bare_hosts if style is None else style)))
+
+    added = len(merged) - len(existing)
+    if added:
+        logging.info(f"{added} new entr{'y' if added == 1 else 'ies'} added.")
+    else:
+        logging.info("No changes made to the file.")
+    return added
+
+
+def write_outputs(found: PrefixSet, domain_list_path: str, kind: str, ipv_mode: str) -> int:
+    """
+    Function, that merges found entries into the ips-/ipset- files of a hostlist, one per IP version.
+
+    :param found: Resolved IPs or CIDRs, both versions.
+    :type found: PrefixSet
+    :param domain_list_path: Hostlist the entries were resolved from.
+    :type domain_list_path: str
+    :param kind: 'ips' or 'ipset'
+    :type kind: str
+    :param ipv_mode: 1 = IPv4, 2 = IPv6, 3 = both.
+    :type ipv_mode: str
+    :return: Number of entries found for the selected versions.
+    :rtype: int
+    """
+    if ipv_mode not in ("1", "2", "3"):
+        logging.error("Invalid IP version mode!")
+        raise ValueError("Invalid IP version mode! Choose from (1, 2, 3).")
 
-        ipv6 = 1 if net.version == 6 else 0
+    total = 0
+    for version in (4, 6):
+        if version == 4 and ipv_mode == "2" or version == 6 and ipv_mode == "1":
+            continue
 
-        return (ipv6, int(net.network_address), net.prefixlen)
+        entries = found.family(version)
+        if not entries:
+            logging.info(f"No IPv{version} {'addresses' if kind == 'ips' else 'cidrs'} found.")
+            continue
+
+        logging.info(f'IPv{version} info:')
+        save_entries(entries, output_path(domain_list_path, kind, version), bare_hosts=kind == "ips")
+        total += len(entries)
+
+    return total
+
+
+def sort_ips(array: set[str]) -> List[str]:
+    def parse(cidr: str) -> Tuple[int, int, int]:
+        version, value, prefix = parse_prefix(cidr)
+        return (1 if version == 6 else 0, value, prefix)
     
     return sorted(array, key=parse)
 
@@ -378,92 +475,13 @@ def process_ips(log: str, domain_list_path: str, ipv_mode: str) -> None:
     :type domain_list_path: str
     :param ipv_mode: IpV4 or IpV6
     :type ipv_mode: str
-    :param cache: Flag, on which depends, are we using cache during getting of ips, or not.
-    :type cache: bool
     """
     ipv4_list, ipv6_list = separate_ips(log, ipv_mode)
-    ipv4_list, ipv6_list = list(set(ipv4_list)), list(set(ipv6_list))
-    total_ips = len(ipv4_list) + len(ipv6_list)
-
-    if ipv_mode == '1':
-        if ipv4_list:
-            ipv4_output_file = os.path.join(
-                os.path.dirname(domain_list_path), 
-                f"ips-ipv4-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv4_output_file, "a", encoding="utf-8") as f:
-                for ip in ipv4_list:
-                    f.write(ip + "\n")
-
-            logging.info('IPv4 info:')
-            remove_duplicates(ipv4_output_file)
-
-
-        else:
-            logging.info("No IPv4 addersses found.")
-
-
-    elif ipv_mode == '2':
-        if ipv6_list:
-            ipv6_output_file = os.path.join(
-                os.path.dirname(domain_list_path),
-                f"ips-ipv6-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv6_output_file, "a", encoding="utf-8") as f:
-                for ip in ipv6_list:
-                    f.write(ip + "\n")
+    total_ips = write_outputs(PrefixSet(ipv4_list + ipv6_list), domain_list_path, "ips", ipv_mode)
+    logging.info(f"Extracted {total_ips} IPs.")
 
-            logging.info('IPv6 info:')
-            remove_duplicates(ipv6_output_file)
 
-        else:
-            logging.info("No IPv6 addresses found.")
-        
-
-    elif ipv_mode == '3':
-        if ipv4_list:
-            ipv4_output_file = os.path.join(
-                os.path.dirname(domain_list_path), 
-                f"ips-ipv4-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv4_output_file, "a", encoding="utf-8") as f:
-                for ip in ipv4_list:
-                    f.write(ip + "\n")
-
-            logging.info('IPv4 info:')
-            remove_duplicates(ipv4_output_file)
-
-        else:
-            logging.info("No IPv4 adddresses created.")
-
-
-        if ipv6_list:
-            ipv6_output_file = os.path.join(
-                os.path.dirname(domain_list_path),
-                f"ips-ipv6-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv6_output_file, "a", encoding="utf-8") as f:
-                for ip in ipv6_list:
-                    f.write(ip + "\n")
-
-            logging.info('IPv6 info:')
-            remove_duplicates(ipv6_output_file)
-            
-        else:
-            logging.info("No IPv6 addresses created.")
-        
-        logging.info(f"Extracted {total_ips} IPs.")
-
-    else:
-        logging.error("Invalid IP version mode!")
-        raise ValueError("Invalid IP version mode! Choose from (1, 2, 3).")
-
-
-def process_cidrs(log, domain_list_path: str, ipv_mode: str, cache: bool) -> None:
+def process_cidrs(log, domain_list_path: str, ipv_mode: str, cache: bool, resume: bool = False) -> None:
     """
     Function, that becomes and writes down the ipsets (cidr sets)
     
@@ -474,100 +492,20 @@ def process_cidrs(log, domain_list_path: str, ipv_mode: str, cache: bool) -> Non
     :type ipv_mode: str
     :param cache: Flag, on which depends, are we using cache during getting of ips, or not.
     :type cache: bool
+    :param resume: Continue an interrupted run from the CIDR journal.
+    :type resume: bool
     """
-    ipv4_list, ipv6_list = separate_ips(log, ipv_mode)
-    ipv4_list, ipv6_list = list(set(ipv4_list)), list(set(ipv6_list))
-    total_cidrs = 0
-
-    if ipv_mode == '1':
-        ipv4_cidrs = asyncio.run(get_cidrs(ipv4_list, cache))
-        if ipv4_cidrs:
-            ipv4_output_file = os.path.join(
-                os.path.dirname(domain_list_path), 
-                f"ipset-ipv4-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv4_output_file, "a", encoding="utf-8") as f:
-                for cidr in ipv4_cidrs:
-                    f.write(str(cidr) + "\n")
-
-            logging.info('IPv4 info:')
-            remove_duplicates(ipv4_output_file)
-
-            total_cidrs += len(ipv4_cidrs)
-
-        else:
-            logging.info("No IPv4 cidrs found.")
-
-
-    elif ipv_mode == '2':
-        ipv6_cidrs = asyncio.run(get_cidrs(ipv6_list, cache))
-        if ipv6_cidrs:
-            ipv6_output_file = os.path.join(
-                os.path.dirname(domain_list_path),
-                f"ipset-ipv6-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv6_output_file, "a", encoding="utf-8") as f:
-                for cidr in ipv6_cidrs:
-                    f.write(str(cidr) + "\n")
-
-            logging.info('IPv6 info:')
-            remove_duplicates(ipv6_output_file)
-
-            total_cidrs += len(ipv6_cidrs)
-
-        else:
-            logging.info("No IPv6 cidrs found.")
-        
+    import asyncio
 
-    elif ipv_mode == '3':
-        ipv4_cidrs, ipv6_cidrs = asyncio.run(get_cidrs(ipv4_list, cache)), asyncio.run(get_cidrs(ipv6_list, cache))
-
-        if ipv4_cidrs:
-            ipv4_output_file = os.path.join(
-                os.path.dirname(domain_list_path), 
-                f"ipset-ipv4-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv4_output_file, "a", encoding="utf-8") as f:
-                for cidr in ipv4_cidrs:
-                    f.write(str(cidr) + "\n")
-
-            logging.info('IPv4 info:')
-            remove_duplicates(ipv4_output_file)
-
-            total_cidrs += len(set(ipv4_cidrs))
-
-        else:
-            logging.info("No IPv4 cidrs created.")
-
-        if ipv6_cidrs:
-            ipv6_output_file = os.path.join(
-                os.path.dirname(domain_list_path),
-                f"ipset-ipv6-{os.path.basename(domain_list_path)}"
-            )
-
-            with open(ipv6_output_file, "a", encoding="utf-8") as f:
-                for cidr in ipv6_cidrs:
-                    f.write(str(cidr) + "\n")
-
-            logging.info('IPv6 info:')
-            remove_duplicates(ipv6_output_file)
-
-            total_cidrs += len(ipv6_cidrs)
-            
-        else:
-            logging.info("No IPv6 cidrs created.")
-
-    else:
-        logging.error("Invalid IP version mode!")
-        raise ValueError("Invalid IP version mode! Choose from (1, 2, 3).")
+    ipv4_list, ipv6_list = separate_ips(log, ipv_mode)
+    cidrs = asyncio.run(get_cidrs(list(dict.fromkeys(ipv4_list + ipv6_list)), cache, resume))
+    total_cidrs = write_outputs(PrefixSet(cidrs), domain_list_path, "ipset", ipv_mode)
+    logging.info(f"Extracted {total_cidrs} CIDRs.")
     
     
-def format_output(log: str, domain_list_path: str, ipv_mode: str, cache: bool = False, flag: str = ["cidrs", "ips"], type: str = "nslookup") -> None:
+def format_output(log: str, domain_list_path: str, ipv_mode: str, cache: bool = False, flag: str = ["cidrs", "ips"], type: str = "nslookup", resume: bool = False) -> None:
     if flag == "cidrs":
-        process_cidrs(log, domain_list_path, ipv_mode, cache)
+        process_cidrs(log, domain_list_path, ipv_mode, cache, resume)
 
     elif flag == "ips":
         process_ips(log, domain_list_path, ipv_mode)
@@ -579,15 +517,32 @@ def format_output(log: str, domain_list_path: str, ipv_mode: str, cache: bool =
 
 
 def main() -> None:
+    service = Service("ipset")
+    Service.setup_logging()
     args = service.argparse().parse_args()
 
     if args.mode == "1":
         try:
-            filepath = service.find_file(args.filename)
+            filepath = Service.find_file(args.filename)
             remove_duplicates(filepath)
         except FileNotFoundError:
             logging.error(f"File '{args.filename}' not found.")
 
+    elif args.mode == "2" and args.watch:
+        if not args.ipv_mode:
+            logging.error("Watch mode needs -ip.")
+            return
+
+        import asyncio
+        from watcher import IpsetWatcher
+
+        flag = "cidrs" if args.cidrs else "ips"
+        watcher = IpsetWatcher(args.watch, args.ipv_mode, flag, args.cache, args.debounce, args.interval)
+        try:
+            asyncio.run(watcher.run())
+        except KeyboardInterrupt:
+            logging.info("Watch mode stopped.")
+
     elif args.mode == "2":
         if args.os_type and args.ipv_mode and args.filename and args.testmode:
             log_data, domain_path = resolve_domains(args.filename, args.os_type, args.ipv_mode, args.testmode)
@@ -595,24 +550,48 @@ def main() -> None:
         if log_data and domain_path:
             flag = "cidrs" if args.cidrs else "ips"
             cache = True if args.cache else False
-            format_output(log_data, domain_path, args.ipv_mode, cache, flag)
+            try:
+                format_output(log_data, domain_path, args.ipv_mode, cache, flag, resume=args.resume)
+            except KeyboardInterrupt:
+                logging.info("Interrupted.")
         else:
             logging.error("Failed to get IPs. Exiting.")
             
-    # elif args.mode == "3":
-    #     if args.port_number:
-    #         ips = get_port(args.port_number)
-    #         if not ips:
-    #             logging.warning(f"No active connections found on port {args.port_number}.")
-    #         else:
-    #             logging.info(f"Found {len(ips)} IP(s) on port {args.port_number}.")
-    #             if args.filename:
-    #                 ip2host(ips, args.port_number, args.filename)
-    #             else:
-    #                 ip2host(ips, args.port_number)
-                
+    elif args.mode == "3":
+        from port_sampler import PortSampler, parse_ports, psutil_kind, live_snapshots, replay_snapshots, sample, merge_into_ipset
+
+        try:
+            ports = parse_ports(args.port_number)
+        except ValueError as e:
+            logging.error(str(e))
+            return
+
+        ipv_mode = args.ipv_mode or "3"
+        if args.replay:
+            snapshots = replay_snapshots(args.replay)
+        else:
+            snapshots = live_snapshots(psutil_kind(args.proto, ipv_mode), args.interval)
+            logging.info(f"Sampling connections on port(s) {args.port_number}, Ctrl-C to stop.")
+
+        try:
+            output = Service.find_file(args.output)
+        except FileNotFoundError:
+            output = args.output
+
+        sampler = PortSampler(ports, ipv_mode)
+
+        def merge() -> None:
+            prefixes = sampler.prefixes(args.prefix4, args.prefix6)
+            added = merge_into_ipset(prefixes, output)
+            logging.info(f"{len(prefixes)} prefix(es) from {len(sampler.ips)} IP(s), {added} new in {output}.")
+
+        sample(snapshots, sampler, args.duration, args.record, merge, args.merge_every)
+
+        if not sampler.ips:
+            logging.warning(f"No connections found on port(s) {args.port_number}.")
+
     else:
-        logging.error("Invalid mode. Choose 1 or 2.")
+        logging.error("Invalid mode. Choose 1, 2 or 3.")
 
 
 
@@ -0,0 +1,97 @@
+import logging, ipaddress
+import ijson
+from urllib.parse import urlsplit
+from typing import Iterable, Iterator, List, Optional, Set
+
+
+HAR_PREFIXES = {
+    "log.entries.item.request.url",
+    "log.entries.item.response.redirectURL",
+}
+
+NETLOG_PREFIXES = {
+    "events.item.params.url",
+    "events.item.params.original_url",
+    "events.item.params.location",
+    "events.item.params.host",
+    "events.item.params.origin",
+}
+
+URL_PREFIXES = HAR_PREFIXES | NETLOG_PREFIXES
+
+
+def to_hostname(value: str) -> Optional[str]:
+    """
+    Function, that turns a URL or a 'host:port' string into a bare hostname.
+
+    :param value: URL, origin or 'host:port' pair from a HAR or net-log file.
+    :type value: str
+    :return: Lowercase hostname, or None for IP literals and unparsable values.
+    :rtype: str | None
+    """
+    value = value.strip()
+    if not value:
+        return None
+
+    try:
+        host = urlsplit(value if "://" in value else f"//{value}").hostname
+    except ValueError:
+        return None
+
+    if not host:
+        return None
+
+    host = host.rstrip(".").lower()
+    if "." not in host:
+        return None
+
+    try:
+        ipaddress.ip_address(host)
+        return None
+    except ValueError:
+        return host
+
+
+def iter_hosts(path: str) -> Iterator[str]:
+    """
+    Stream-parses a HAR or Chrome net-export file and yields hostnames.
+
+    Only the parser state is kept in memory, so the file size does not matter.
+    A truncated net-log (Chrome stopped mid-write) yields everything before the cut.
+
+    :param path: Path to .har or net-export .json file.
+    :type path: str
+    """
+    with open(path, "rb") as f:
+        try:
+            for prefix, event, value in ijson.parse(f):
+                if event == "string" and prefix in URL_PREFIXES:
+                    host = to_hostname(value)
+                    if host:
+                        yield host
+        except ijson.IncompleteJSONError as e:
+            logging.warning(f"{path} is truncated, using entries read so far ({e}).")
+
+
+def import_hosts(paths: Iterable[str]) -> List[str]:
+    """
+    Function, that collects unique hostnames from several HAR / net-log files.
+
+    :param paths: Paths to the files.
+    :type paths: Iterable[str]
+    :return: Sorted unique hostnames.
+    :rtype: List[str]
+    """
+    hosts: Set[str] = set()
+
+    for path in paths:
+        before = len(hosts)
+        try:
+            hosts.update(iter_hosts(path))
+        except (OSError, ijson.JSONError) as e:
+            logging.error(f"Failed to read {path}: {e}")
+            continue
+        logging.info(f"{path}: {len(hosts) - before} new host(s).")
+
+    logging.info(f"Total unique hosts imported: {len(hosts)}")
+    return sorted(hosts)
@@ -0,0 +1,254 @@
+import re, logging
+import asyncio, aiohttp
+import tldextract
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+from typing import Callable, List, Set, Tuple, Optional
+
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36"
+)
+
+URL_ATTRS = {"src", "href", "data-src", "poster", "action", "content", "data", "formaction"}
+HINT_RELS = {"preconnect", "dns-prefetch", "preload", "prefetch", "modulepreload", "stylesheet", "icon"}
+
+CSS_URL_RE = re.compile(r"""url\(\s*['"]?([^'")\s]+)['"]?\s*\)""", re.IGNORECASE)
+CSS_IMPORT_RE = re.compile(r"""@import\s+['"]([^'"]+)['"]""", re.IGNORECASE)
+SCRIPT_URL_RE = re.compile(r"""['"`]((?:https?:|wss?:)?//[a-z0-9.-]+\.[a-z]{2,}[^'"`\s]*)['"`]""", re.IGNORECASE)
+
+PAGE, SCRIPT, STYLE = "page", "script", "style"
+
+
+class LinkExtractor(HTMLParser):
+    """
+    Collects URLs from HTML attributes, inline styles and inline scripts.
+    """
+
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.urls: List[str] = []
+        self.pages: List[str] = []
+        self.scripts: List[str] = []
+        self.styles: List[str] = []
+        self._in_script = False
+        self._in_style = False
+
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attrs_map = {name.lower(): value for name, value in attrs if value}
+        rels = set(attrs_map.get("rel", "").lower().split())
+
+        for name, value in attrs_map.items():
+            if name in URL_ATTRS:
+                self.urls.append(value)
+            elif name in ("srcset", "imagesrcset"):
+                self.urls.extend(part.strip().split(" ")[0] for part in value.split(",") if part.strip())
+            elif name == "style":
+                self.urls.extend(CSS_URL_RE.findall(value))
+
+        if tag == "a" and "href" in attrs_map:
+            self.pages.append(attrs_map["href"])
+        elif tag == "iframe" and "src" in attrs_map:
+            self.pages.append(attrs_map["src"])
+        elif tag == "script":
+            if "src" in attrs_map:
+                self.scripts.append(attrs_map["src"])
+            else:
+                self._in_script = True
+        elif tag == "link" and "href" in attrs_map:
+            if "stylesheet" in rels:
+                self.styles.append(attrs_map["href"])
+            elif rels & HINT_RELS:
+                self.urls.append(attrs_map["href"])
+        elif tag == "style":
+            self._in_style = True
+
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "script":
+            self._in_script = False
+        elif tag == "style":
+            self._in_style = False
+
+
+    def handle_data(self, data: str) -> None:
+        if self._in_script:
+            self.urls.extend(SCRIPT_URL_RE.findall(data))
+        elif self._in_style:
+            self.urls.extend(CSS_URL_RE.findall(data))
+            self.styles.extend(CSS_IMPORT_RE.findall(data))
+
+
+def hostname(url: str) -> Optional[str]:
+    try:
+        host = urlsplit(url).hostname
+    except ValueError:
+        return None
+    return host.rstrip(".").lower() if host else None
+
+
+def site_of(host: str) -> str:
+    ext = tldextract.extract(host)
+    return f"{ext.domain}.{ext.suffix}" if ext.suffix else host
+
+
+def same_site(url: str, site: str) -> bool:
+    host = hostname(url)
+    return bool(host) and site_of(host) == site
+
+
+def absolute_url(base_url: str, url: str) -> Optional[str]:
+    """
+    Resolves url against base_url, None for empty or malformed ones (e.g. 'http://[oops/x').
+    """
+    url = url.strip()
+    if not url:
+        return None
+    try:
+        return urljoin(base_url, url)
+    except ValueError:
+        logging.debug(f"Skipping malformed URL on {base_url}: {url}")
+        return None
+
+
+def extract_links(kind: str, base_url: str, text: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Function, that pulls absolute URLs and follow-up fetches out of a document.
+
+    :param kind: Document type (page, script, style).
+    :type kind: str
+    :param base_url: URL the document was fetched from.
+    :type base_url: str
+    :param text: Document body.
+    :type text: str
+    :return: Absolute URLs found and (kind, url) pairs worth fetching next.
+    :rtype: Tuple[List[str], List[Tuple[str, str]]]
+    """
+    follow = []
+
+    if kind == PAGE:
+        parser = LinkExtractor()
+        try:
+            parser.feed(text)
+            parser.close()
+        except Exception as e:
+            logging.debug(f"HTML parse error on {base_url}: {e}")
+
+        found = parser.urls + parser.pages + parser.scripts + parser.styles
+        follow += [(PAGE, url) for url in parser.pages]
+        follow += [(SCRIPT, url) for url in parser.scripts]
+        follow += [(STYLE, url) for url in parser.styles]
+
+    elif kind == STYLE:
+        imports = CSS_IMPORT_RE.findall(text)
+        found = CSS_URL_RE.findall(text) + imports
+        follow += [(STYLE, url) for url in imports]
+
+    else:
+        found = SCRIPT_URL_RE.findall(text)
+
+    absolute = [url for url in (absolute_url(base_url, url) for url in found) if url]
+    follow = [(k, url.split("#")[0]) for k, url in ((k, absolute_url(base_url, url)) for k, url in follow) if url]
+    return absolute, follow
+
+
+async def crawl(hosts: List[str], depth: int = 2, concurrency: int = 10, timeout: float = 10.0, max_fetches: int = 500, on_domain: Optional[Callable[[str], None]] = None) -> List[str]:
+    """
+    Browser-free domain discovery over plain HTTP.
+
+    :param hosts: Hosts (or URLs) to start from.
+    :type hosts: List[str]
+    :param depth: How many links deep to follow same-site pages, scripts and stylesheets.
+    :type depth: int
+    :param concurrency: Max number of requests in flight.
+    :type concurrency: int
+    :param timeout: Per-request timeout in seconds.
+    :type timeout: float
+    :param max_fetches: Hard cap on the number of fetched documents.
+    :type max_fetches: int
+    :param on_domain: Called once for every newly found hostname, as soon as it is found.
+    :type on_domain: Callable[[str], None] | None
+    :return: Sorted unique hostnames.
+    :rtype: List[str]
+    """
+    domains: Set[str] = set()
+    seen: Set[str] = set()
+    queue: "asyncio.Queue[Tuple[str, str, str, int]]" = asyncio.Queue()
+
+    def add_domain(host: Optional[str]) -> None:
+        if host and host not in domains:
+            domains.add(host)
+            if on_domain:
+                on_domain(host)
+
+    for host in hosts:
+        url = host if "://" in host else f"https://{host}"
+        site = site_of(hostname(url) or "")
+        seen.add(url)
+        queue.put_nowait((PAGE, url, site, 0))
+
+    async def fetch(session: aiohttp.ClientSession, kind: str, url: str, site: str, level: int) -> None:
+        try:
+            async with session.get(url, allow_redirects=True) as response:
+                final_url = str(response.url)
+                add_domain(hostname(final_url))
+
+                if response.status != 200:
+                    logging.debug(f"{url}: HTTP {response.status}")
+                    return
+
+                content_type = response.headers.get("Content-Type", "").lower()
+                if kind == PAGE and "html" not in content_type:
+                    return
+
+                text = await response.text(errors="replace")
+
+        except (aiohttp.ClientError, asyncio.TimeoutError, UnicodeDecodeError) as e:
+            logging.debug(f"Failed to fetch {url}: {e}")
+            return
+
+        found, follow = extract_links(kind, final_url, text)
+        for found_url in found:
+            add_domain(hostname(found_url))
+
+        if level >= depth:
+            return
+
+        for next_kind, next_url in follow:
+            if not next_url.startswith(("http://", "https://")) or next_url in seen:
+                continue
+            if not same_site(next_url, site):
+                continue
+            if len(seen) >= max_fetches:
+                break
+            seen.add(next_url)
+            queue.put_nowait((next_kind, next_url, site, level + 1))
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        while True:
+            kind, url, site, level = await queue.get()
+            try:
+                logging.debug(f"Fetching {kind} {url} (depth {level})")
+                await fetch(session, kind, url, site, level)
+            except Exception as e:
+                # a dead worker would leave queue.join() waiting forever
+                logging.warning(f"Failed to process {url}: {e!r}")
+            finally:
+                queue.task_done()
+
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    headers = {"User-Agent": DEFAULT_USER_AGENT}
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(timeout=client_timeout, headers=headers, connector=connector) as session:
+        workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+        await queue.join()
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    logging.info(f"Fetched {len(seen)} document(s), found {len(domains)} unique domain(s).")
+    return sorted(domains)
@@ -0,0 +1,338 @@
+import os, heapq, logging, hashlib, tempfile
+from typing import Iterator, List, Optional, Tuple
+from service import Service
+from prefixset import parse_prefix
+
+
+DELTA_VERSION = 1
+DELTA_MAGIC = f"# ipset-delta v{DELTA_VERSION}"
+IPSET_ALL_URL = "https://raw.githubusercontent.com/Flowseal/zapret-discord-youtube/refs/heads/main/lists/ipset-all.txt"
+# entries sorted in memory at a time; larger unsorted files are sorted through temp files
+SORT_CHUNK = 100000
+
+Key = Tuple[int, int, int, str]
+
+
+class _UpToDate(Exception):
+    pass
+
+
+def entry_key(entry: str) -> Key:
+    """
+    Sort key of an ipset entry: IPv4 first, then address, prefix length and the literal text,
+    so that two different spellings of the same network stay distinct entries.
+    """
+    version, value, prefix = parse_prefix(entry)
+    return (0 if version == 4 else 1, value, prefix, entry)
+
+
+def _read_entries(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+def _sorted_runs(path: str) -> Iterator[Tuple[Key, str]]:
+    """
+    External sort: sorts SORT_CHUNK entries at a time into temp files and merges them,
+    so memory stays bounded by the chunk size instead of the file size.
+    """
+    runs: List[str] = []
+    chunk: List[Tuple[Key, str]] = []
+
+    def spill() -> None:
+        chunk.sort()
+        fd, run_path = tempfile.mkstemp(prefix=".sort-", suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.writelines(entry + "\n" for _, entry in chunk)
+        runs.append(run_path)
+        chunk.clear()
+
+    def read_run(run_path: str) -> Iterator[Tuple[Key, str]]:
+        with open(run_path, "r", encoding="utf-8") as f:
+            for line in f:
+                entry = line.rstrip("\n")
+                yield entry_key(entry), entry
+
+    try:
+        for entry in _read_entries(path):
+            chunk.append((entry_key(entry), entry))
+            if len(chunk) >= SORT_CHUNK:
+                spill()
+
+        if not runs:
+            chunk.sort()
+            yield from chunk
+            return
+
+        if chunk:
+            spill()
+        yield from heapq.merge(*(read_run(run_path) for run_path in runs))
+    finally:
+        for run_path in runs:
+            os.unlink(run_path)
+
+
+def iter_sorted(path: str) -> Iterator[Tuple[Key, str]]:
+    """
+    Yields the unique entries of an ipset file in canonical order.
+
+    Files that are already sorted are streamed in constant memory. Unsorted ones (like
+    ipset-cloudflare.txt) cost an O(n log n) sort: in memory up to SORT_CHUNK entries,
+    through temp files beyond that.
+
+    :param path: Path to the ipset file.
+    :type path: str
+    """
+    is_sorted = True
+    previous = None
+    for entry in _read_entries(path):
+        key = entry_key(entry)
+        if previous is not None and key < previous:
+            is_sorted = False
+            break
+        previous = key
+
+    if is_sorted:
+        entries = ((entry_key(entry), entry) for entry in _read_entries(path))
+    else:
+        logging.debug(f"{path} is not sorted, sorting it first.")
+        entries = _sorted_runs(path)
+
+    previous = None
+    for key, entry in entries:
+        if key != previous:
+            yield key, entry
+        previous = key
+
+
+def content_hash(path: str) -> str:
+    """
+    sha256 of the canonical form of an ipset file (sorted unique entries, one per line).
+    """
+    digest = hashlib.sha256()
+    for _ in hashed(iter_sorted(path), digest):
+        pass
+    return digest.hexdigest()
+
+
+def hashed(entries: Iterator[Tuple[Key, str]], digest: "hashlib._Hash") -> Iterator[Tuple[Key, str]]:
+    for key, entry in entries:
+        digest.update(entry.encode() + b"\n")
+        yield key, entry
+
+
+def merge_diff(old_iter: Iterator[Tuple[Key, str]], new_iter: Iterator[Tuple[Key, str]]) -> Iterator[Tuple[str, str]]:
+    """
+    Single linear pass over both sorted streams, yields ('-', entry) and ('+', entry) in canonical order.
+    """
+    old, new = next(old_iter, None), next(new_iter, None)
+
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            yield "-", old[1]
+            old = next(old_iter, None)
+        elif old is None or new[0] < old[0]:
+            yield "+", new[1]
+            new = next(new_iter, None)
+        else:
+            old, new = next(old_iter, None), next(new_iter, None)
+
+
+def make_delta(old_path: str, new_path: str, delta_path: Optional[str] = None) -> Optional[str]:
+    """
+    Function, that writes a delta between two ipset versions.
+
+    The delta is a header with the content hashes of both versions, followed by runs of
+    entries: a line with a lone '+' or '-' switches the operation for the entries below it.
+    Both versions are read in one merge pass; only the changed entries are held in memory.
+
+    :param old_path: Previous ipset version.
+    :type old_path: str
+    :param new_path: New ipset version.
+    :type new_path: str
+    :param delta_path: Output path, defaults to '<new name>.<old hash>-<new hash>.delta'.
+    :type delta_path: str | None
+    :return: Path of the written delta, or None if versions are identical.
+    :rtype: str | None
+    """
+    old_digest, new_digest = hashlib.sha256(), hashlib.sha256()
+    changes = list(merge_diff(
+        hashed(iter_sorted(old_path), old_digest),
+        hashed(iter_sorted(new_path), new_digest)
+    ))
+    old_hash, new_hash = old_digest.hexdigest(), new_digest.hexdigest()
+
+    if not changes:
+        logging.info("Both versions have the same content, no delta needed.")
+        return None
+
+    if delta_path is None:
+        base = os.path.splitext(new_path)[0]
+        delta_path = f"{base}.{old_hash[:8]}-{new_hash[:8]}.delta"
+
+    def lines() -> Iterator[str]:
+        yield DELTA_MAGIC
+        yield f"# from {old_hash}"
+        yield f"# to {new_hash}"
+        current = None
+        for op, entry in changes:
+            if op != current:
+                current = op
+                yield op
+            yield entry
+
+    Service.write_atomic(delta_path, lines())
+    added = sum(1 for op, _ in changes if op == "+")
+    logging.info(f"Delta {delta_path}: {added} added, {len(changes) - added} removed.")
+    return delta_path
+
+
+def read_delta(delta_path: str) -> Tuple[str, str, Iterator[Tuple[Key, str, str]]]:
+    """
+    Parses the delta header and returns (from hash, to hash, iterator of (key, op, entry)).
+    """
+    f = open(delta_path, "r", encoding="utf-8")
+    header = [f.readline().strip() for _ in range(3)]
+
+    if header[0] != DELTA_MAGIC or not header[1].startswith("# from ") or not header[2].startswith("# to "):
+        f.close()
+        raise ValueError(f"'{delta_path}' is not an ipset delta v{DELTA_VERSION} file.")
+
+    def ops() -> Iterator[Tuple[Key, str, str]]:
+        with f:
+            op = None
+            for line in f:
+                line = line.strip()
+                if line in ("+", "-"):
+                    op = line
+                elif line:
+                    if op is None:
+                        raise ValueError(f"Entry '{line}' outside of a +/- run in '{delta_path}'.")
+                    yield entry_key(line), op, line
+
+    return header[1][len("# from "):], header[2][len("# to "):], ops()
+
+
+def merge_apply(local_iter: Iterator[Tuple[Key, str]], ops: Iterator[Tuple[Key, str, str]]) -> Iterator[str]:
+    """
+    Single linear pass that patches the sorted local entries with sorted delta ops.
+    """
+    local, op = next(local_iter, None), next(ops, None)
+
+    while local is not None or op is not None:
+        if op is None or (local is not None and local[0] < op[0]):
+            yield local[1]
+            local = next(local_iter, None)
+        elif local is None or op[0] < local[0]:
+            if op[1] == "+":
+                yield op[2]
+            op = next(ops, None)
+        else:
+            if op[1] == "+":
+                yield local[1]
+            local, op = next(local_iter, None), next(ops, None)
+
+
+def validated(lines: Iterator[str]) -> Iterator[str]:
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            entry_key(line)
+        yield line
+
+
+def fetch_full(target_path: str, url: str) -> bool:
+    import urllib.request
+
+    logging.info(f"Downloading full list from {url}...")
+    try:
+        with urllib.request.urlopen(url, timeout=30) as response:
+            Service.write_atomic(target_path, validated(line.decode("utf-8-sig") for line in response))
+    except (OSError, ValueError) as e:
+        logging.error(f"Full download failed: {e}")
+        return False
+
+    logging.info(f"{target_path} replaced with the full list.")
+    return True
+
+
+def apply_delta(delta_path: str, target_path: str, url: Optional[str] = IPSET_ALL_URL) -> bool:
+    """
+    Function, that patches an ipset file with a delta, atomically.
+
+    The local file must hash to the delta's 'from' hash, and the patched result to its 'to' hash;
+    otherwise the file is left untouched and, if url is set, the full list is downloaded instead.
+
+    :param delta_path: Delta produced by make_delta.
+    :type delta_path: str
+    :param target_path: Local ipset file to patch.
+    :type target_path: str
+    :param url: Full list URL for the fallback, or None to disable it.
+    :type url: str | None
+    :return: True if the target is now up to date.
+    :rtype: bool
+    """
+    from_hash, to_hash, ops = read_delta(delta_path)
+
+    if os.path.isfile(target_path):
+        local_digest, patched_digest = hashlib.sha256(), hashlib.sha256()
+
+        def lines() -> Iterator[str]:
+            for entry in merge_apply(hashed(iter_sorted(target_path), local_digest), ops):
+                patched_digest.update(entry.encode() + b"\n")
+                yield entry
+
+            if local_digest.hexdigest() == to_hash:
+                raise _UpToDate(f"{target_path} is already up to date.")
+            if local_digest.hexdigest() != from_hash:
+                raise ValueError(f"{target_path} does not match the delta's base version.")
+            if patched_digest.hexdigest() != to_hash:
+                raise ValueError("Patched list does not match the delta's target hash.")
+
+        try:
+            Service.write_atomic(target_path, lines())
+            logging.info(f"{target_path} patched to {to_hash[:8]}.")
+            return True
+        except _UpToDate as e:
+            logging.info(str(e))
+            return True
+        except ValueError as e:
+            logging.warning(str(e))
+    else:
+        logging.warning(f"{target_path} does not exist.")
+
+    if url:
+        return fetch_full(target_path, url)
+    return False
+
+
+def main() -> None:
+    service = Service("delta")
+    Service.setup_logging()
+    args = service.argparse().parse_args()
+
+    if args.mode == "make":
+        if not args.old or not args.new:
+            logging.error("Mode 'make' needs -old and -new.")
+            return
+        make_delta(args.old, args.new, args.delta)
+
+    elif args.mode == "apply":
+        if not args.delta:
+            logging.error("Mode 'apply' needs -d.")
+            return
+        url = None if args.no_fetch else args.url
+        try:
+            target_path = Service.find_file(args.filename)
+        except FileNotFoundError:
+            # a missing local list is what the full download is for
+            target_path = args.filename
+        if not apply_delta(args.delta, target_path, url):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
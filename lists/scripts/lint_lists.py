@@ -0,0 +1,289 @@
+import os, re, glob, fnmatch, logging
+from typing import Dict, Iterator, List, Optional, Tuple
+from service import Service
+from prefixset import parse_prefix, format_prefix
+
+
+LIST_PATTERNS = ("list-*.txt", "hostlist-*.txt", "ipset-*.txt", "ips-*.txt")
+PLACEHOLDER = "0.0.0.0/32"
+PLACEHOLDER_FILE = "ipset-all.txt"
+
+HOST_RE = re.compile(r"^(?=.{1,253}$)([a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?\.)*[a-z0-9_]([a-z0-9_-]{0,61}[a-z0-9_])?$")
+
+
+class Issue:
+    """
+    One finding: 'error' entries break or are ignored by winws, 'warning' ones are only redundant or untidy.
+    """
+    __slots__ = ("path", "line", "level", "message")
+
+
+    def __init__(self, path: str, line: int, level: str, message: str) -> None:
+        self.path = path
+        self.line = line
+        self.level = level
+        self.message = message
+
+
+    def __str__(self):
+        return f"{self.path}:{self.line}: {self.message}"
+
+
+def list_kind(name: str) -> Optional[Tuple[str, Optional[int]]]:
+    """
+    ('host', None) for hostlists, ('ip', 4 / 6 / None) for ipsets, None for other files.
+    """
+    if not any(fnmatch.fnmatch(name, pattern) for pattern in LIST_PATTERNS):
+        return None
+    if name.startswith(("ipset-", "ips-")):
+        for version in (4, 6):
+            if name.startswith((f"ipset-ipv{version}-", f"ips-ipv{version}-")):
+                return "ip", version
+        return "ip", None
+    return "host", None
+
+
+def read_lines(path: str) -> Tuple[Iterator[Tuple[int, str]], str]:
+    """
+    Streams (line number, line without line ending) and reports the file's line ending.
+    """
+    with open(path, "rb") as f:
+        newline = "\r\n" if b"\r\n" in f.readline() else "\n"
+
+    def lines() -> Iterator[Tuple[int, str]]:
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            for number, line in enumerate(f, 1):
+                yield number, line.rstrip("\r\n")
+
+    return lines(), newline
+
+
+def check_host(host: str) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    Function, that validates one hostlist token.
+
+    :return: The fixed hostname (None if it cannot be fixed) and (level, message) findings.
+    :rtype: Tuple[str | None, List[Tuple[str, str]]]
+    """
+    problems = []
+    fixed = host
+
+    if "://" in fixed or "/" in fixed:
+        from urllib.parse import urlsplit
+        fixed = urlsplit(fixed if "://" in fixed else f"//{fixed}").hostname or ""
+        problems.append(("error", f"'{host}' is a URL, winws matches hostnames only"))
+
+    if fixed != fixed.lower():
+        fixed = fixed.lower()
+        problems.append(("warning", f"'{host}' is not lowercase"))
+
+    if fixed.endswith("."):
+        fixed = fixed.rstrip(".")
+        problems.append(("warning", f"'{host}' has a trailing dot"))
+
+    if not fixed.isascii():
+        try:
+            fixed = fixed.encode("idna").decode("ascii")
+            problems.append(("error", f"'{host}' is not punycode, use '{fixed}'"))
+        except UnicodeError:
+            problems.append(("error", f"'{host}' is not a valid hostname"))
+            return None, problems
+
+    if not HOST_RE.match(fixed):
+        problems.append(("error", f"'{host}' is not a valid hostname"))
+        return None, problems
+
+    return fixed, problems
+
+
+def parent_in(host: str, hosts: Dict[str, int]) -> Optional[str]:
+    labels = host.split(".")
+    for i in range(1, len(labels)):
+        parent = ".".join(labels[i:])
+        if parent in hosts:
+            return parent
+    return None
+
+
+def lint_hostlist(path: str, lines: Iterator[Tuple[int, str]]) -> Tuple[List[Issue], List[str]]:
+    issues, output = [], []
+    hosts: Dict[str, int] = {}
+    entries: List[Tuple[int, str]] = []
+
+    for number, line in lines:
+        stripped = line.strip()
+        if stripped != line:
+            issues.append(Issue(path, number, "warning", "leading or trailing whitespace"))
+        if not stripped or stripped.startswith("#"):
+            output.append(stripped)
+            continue
+
+        tokens = stripped.split()
+        if len(tokens) > 1:
+            issues.append(Issue(path, number, "warning", f"{len(tokens)} hosts on one line, use one per line"))
+
+        for token in tokens:
+            fixed, problems = check_host(token)
+            issues += [Issue(path, number, level, message) for level, message in problems]
+            if fixed is None:
+                continue
+            if fixed in hosts:
+                issues.append(Issue(path, number, "warning", f"'{fixed}' duplicates line {hosts[fixed]}"))
+                continue
+            hosts[fixed] = number
+            entries.append((len(output), fixed))
+            output.append(fixed)
+
+    # winws hostlists match subdomains, so a host under a listed parent is redundant
+    for index, host in entries:
+        parent = parent_in(host, hosts)
+        if parent is not None:
+            issues.append(Issue(path, hosts[host], "warning", f"'{host}' is covered by '{parent}' (line {hosts[parent]})"))
+            output[index] = None
+
+    return issues, [line for line in output if line is not None]
+
+
+def lint_ipset(path: str, lines: Iterator[Tuple[int, str]], version: Optional[int]) -> Tuple[List[Issue], List[str]]:
+    issues: List[Issue] = []
+    output: List[Optional[str]] = []
+    seen: Dict[Tuple[int, int, int], int] = {}
+    entries: List[Tuple[int, int, int, int, int]] = []
+    placeholder: Optional[Tuple[int, int]] = None
+    name = os.path.basename(path)
+
+    for number, line in lines:
+        stripped = line.strip()
+        if stripped != line:
+            issues.append(Issue(path, number, "warning", "leading or trailing whitespace"))
+        if not stripped or stripped.startswith("#"):
+            output.append(stripped)
+            continue
+
+        if stripped == PLACEHOLDER:
+            if name != PLACEHOLDER_FILE:
+                issues.append(Issue(path, number, "warning", f"'{PLACEHOLDER}' placeholder outside {PLACEHOLDER_FILE}"))
+            placeholder = (number, len(output))
+            output.append(stripped)
+            continue
+
+        try:
+            entry_version, value, length = parse_prefix(stripped)
+        except ValueError as e:
+            issues.append(Issue(path, number, "error", str(e)))
+            continue
+
+        if version is not None and entry_version != version:
+            issues.append(Issue(path, number, "error", f"IPv{entry_version} entry '{stripped}' in an IPv{version}-only file"))
+            continue
+
+        fixed = stripped
+        try:
+            parse_prefix(stripped, strict=True)
+        except ValueError:
+            fixed = format_prefix(entry_version, value, length)
+            issues.append(Issue(path, number, "error", f"'{stripped}' has host bits set, it means '{fixed}'"))
+
+        key = (entry_version, value, length)
+        if key in seen:
+            issues.append(Issue(path, number, "warning", f"'{stripped}' duplicates line {seen[key]}"))
+            continue
+        seen[key] = number
+        entries.append((entry_version, value, length, number, len(output)))
+        output.append(fixed)
+
+    if placeholder is not None and entries:
+        issues.append(Issue(
+            path, placeholder[0], "error",
+            f"'{PLACEHOLDER}' placeholder mixed with real entries, service.bat then reports the ipset as empty"
+        ))
+        output[placeholder[1]] = None
+
+    # prefixes are nested or disjoint, so in address order (wider first) a covered
+    # entry always lies inside the last uncovered one
+    for family, bits in ((4, 32), (6, 128)):
+        end, end_line = -1, 0
+        for _, value, length, number, index in sorted(entry for entry in entries if entry[0] == family):
+            last = value | ((1 << (bits - length)) - 1)
+            if last <= end:
+                issues.append(Issue(path, number, "warning", f"'{output[index]}' is covered by line {end_line}"))
+                output[index] = None
+            else:
+                end, end_line = last, number
+
+    return issues, [line for line in output if line is not None]
+
+
+def lint_file(path: str, fix: bool = False) -> List[Issue]:
+    """
+    Function, that checks one list file in a single pass and optionally rewrites it fixed.
+
+    :param path: List file.
+    :type path: str
+    :param fix: Write the fixed content back (atomically, keeping the line endings).
+    :type fix: bool
+    :return: Findings, in line order.
+    :rtype: List[Issue]
+    """
+    kind, version = list_kind(os.path.basename(path)) or ("host", None)
+    lines, newline = read_lines(path)
+
+    if kind == "ip":
+        issues, fixed = lint_ipset(path, lines, version)
+    else:
+        issues, fixed = lint_hostlist(path, lines)
+
+    if fix and issues:
+        while fixed and not fixed[-1]:
+            fixed.pop()
+        Service.write_atomic(path, fixed, newline)
+
+    return sorted(issues, key=lambda issue: issue.line)
+
+
+def find_lists(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                os.path.join(os.path.normpath(path), entry.name)
+                for entry in os.scandir(path) if entry.is_file() and list_kind(entry.name)
+            )
+        else:
+            files += sorted(glob.glob(path)) or [path]
+    return files
+
+
+def main() -> None:
+    service = Service("lint")
+    Service.setup_logging()
+    args = service.argparse().parse_args()
+
+    errors = warnings = left = 0
+    files = find_lists(args.paths)
+
+    for path in files:
+        issues = lint_file(path, args.fix)
+        for issue in issues:
+            if issue.level == "error":
+                errors += 1
+                logging.error(str(issue))
+            else:
+                warnings += 1
+                logging.warning(str(issue))
+
+        if args.fix and issues:
+            for issue in lint_file(path):
+                left += 1
+                logging.error(f"Still present after --fix: {issue}")
+
+    action = "fixed" if args.fix else "found"
+    logging.info(f"{len(files)} file(s) checked, {errors} error(s) and {warnings} warning(s) {action}.")
+
+    # --fix only cleans up warnings; an error entry was dropped or reinterpreted, which needs a look
+    if errors or left or args.strict and warnings and not args.fix:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
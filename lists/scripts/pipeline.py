@@ -0,0 +1,196 @@
+import os, logging, ipaddress
+import asyncio
+from typing import List, Optional, Set
+from service import Service
+from resolver import Resolver
+from remove_dup_hosts import is_covered, only_main_dom
+from get_ipsets import fetch_cidrs, load_cache_from_disk, save_cache_to_disk, write_outputs
+from prefixset import PrefixSet
+
+
+def load_hostlist(path: str) -> List[str]:
+    if not os.path.isfile(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip().lower() for line in f if line.strip()]
+
+
+def append_hostlist(path: str, domains: List[str]) -> None:
+    if not domains:
+        return
+
+    content = ""
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+
+    with open(path, "a", encoding="utf-8") as f:
+        if content and not content.endswith("\n"):
+            f.write("\n")
+        for domain in domains:
+            f.write(domain + "\n")
+
+
+async def discover(queue: "asyncio.Queue[Optional[str]]", hosts: List[str], har_files: Optional[List[str]], depth: int, workers: int, timeout: float) -> None:
+    """
+    Producer stage: pushes every discovered domain to the queue, then a None sentinel.
+    """
+    try:
+        if har_files:
+            import ijson
+            from har_import import iter_hosts
+            loop = asyncio.get_running_loop()
+
+            def read_all() -> None:
+                # HARs repeat the same hosts thousands of times, only hand over each one once
+                seen: Set[str] = set()
+                for path in har_files:
+                    try:
+                        for host in iter_hosts(path):
+                            if host not in seen:
+                                seen.add(host)
+                                loop.call_soon_threadsafe(queue.put_nowait, host)
+                    except (OSError, ijson.JSONError) as e:
+                        logging.error(f"Failed to read {path}: {e}")
+
+            await asyncio.to_thread(read_all)
+
+        if hosts:
+            from http_crawler import crawl
+            await crawl(hosts, depth, workers, timeout, on_domain=queue.put_nowait)
+    finally:
+        queue.put_nowait(None)
+
+
+async def run_pipeline(hostlist_path: str, hosts: List[str], har_files: Optional[List[str]], ipv_mode: str, flag: str,
+                       cache_flag: bool = False, only_main: bool = False, depth: int = 2, workers: int = 10, timeout: float = 10.0) -> None:
+    """
+    Discovery -> dedup/compaction -> hostlist merge -> resolution -> ipset, in one event loop.
+
+    Domains already in the hostlist start resolving immediately, discovered ones as soon as
+    they pass dedup, so resolution overlaps with crawling.
+
+    :param hostlist_path: Hostlist to merge discovered domains into; outputs are written next to it.
+    :type hostlist_path: str
+    :param hosts: Seed hosts for the http crawler.
+    :type hosts: List[str]
+    :param har_files: HAR / net-export files to import.
+    :type har_files: List[str] | None
+    :param ipv_mode: 1 = IPv4, 2 = IPv6, 3 = both.
+    :type ipv_mode: str
+    :param flag: 'cidrs' or 'ips'.
+    :type flag: str
+    :param cache_flag: Use the CIDR cache.
+    :type cache_flag: bool
+    :param only_main: Reduce discovered domains to their registered domain.
+    :type only_main: bool
+    """
+    import aiohttp
+
+    existing = load_hostlist(hostlist_path)
+    known: Set[str] = set(existing)
+    new_domains: List[str] = []
+
+    resolver = Resolver(ipv_mode, concurrency=workers * 5)
+    ipv4_set: Set[str] = set()
+    ipv6_set: Set[str] = set()
+    cidr_set: Set[str] = set()
+    requested_ips: Set[str] = set()
+
+    cache = load_cache_from_disk() if cache_flag else None
+    domain_queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    tasks: List[asyncio.Task] = []
+    rdap_limit = asyncio.Semaphore(workers)
+
+    async with aiohttp.ClientSession() as session:
+
+        async def lookup_cidrs(ip: str) -> None:
+            async with rdap_limit:
+                cidr_set.update(await fetch_cidrs(ip, session, cache))
+
+        async def resolve(domain: str) -> None:
+            ipv4_list, ipv6_list = await resolver.resolve(domain)
+            ipv4_set.update(ipv4_list)
+            ipv6_set.update(ipv6_list)
+
+            if flag == "cidrs":
+                for ip in ipv4_list + ipv6_list:
+                    if ip not in requested_ips:
+                        requested_ips.add(ip)
+                        tasks.append(asyncio.create_task(lookup_cidrs(ip)))
+
+        for domain in existing:
+            tasks.append(asyncio.create_task(resolve(domain)))
+
+        producer = asyncio.create_task(discover(domain_queue, hosts, har_files, depth, workers, timeout))
+
+        while True:
+            domain = await domain_queue.get()
+            if domain is None:
+                break
+
+            try:
+                ipaddress.ip_address(domain)
+                continue
+            except ValueError:
+                pass
+
+            if only_main:
+                domain = only_main_dom([domain])[0]
+
+            if is_covered(domain, known):
+                continue
+
+            # a parent arriving after its subdomains makes them redundant
+            suffix = f".{domain}"
+            covered = [accepted for accepted in new_domains if accepted.endswith(suffix)]
+            if covered:
+                new_domains[:] = [accepted for accepted in new_domains if not accepted.endswith(suffix)]
+                logging.info(f"{domain} covers {', '.join(covered)}")
+
+            known.add(domain)
+            new_domains.append(domain)
+            logging.info(f"New domain: {domain}")
+            tasks.append(asyncio.create_task(resolve(domain)))
+
+        await producer
+
+        while tasks:
+            pending, tasks[:] = list(tasks), []
+            await asyncio.gather(*pending)
+
+    if cache_flag:
+        save_cache_to_disk(cache)
+
+    append_hostlist(hostlist_path, new_domains)
+    logging.info(f"{len(new_domains)} new domain(s) merged into {hostlist_path}.")
+
+    if flag == "cidrs":
+        write_outputs(PrefixSet(cidr_set), hostlist_path, "ipset", ipv_mode)
+    else:
+        write_outputs(PrefixSet(ipv4_set | ipv6_set), hostlist_path, "ips", ipv_mode)
+
+
+def main() -> None:
+    service = Service("pipeline")
+    Service.setup_logging()
+    args = service.argparse().parse_args()
+
+    hosts = []
+    if args.filename:
+        with open(Service.find_file(args.filename), "r", encoding="utf-8") as f:
+            hosts = [line.strip() for line in f if line.strip()]
+
+    if not hosts and not args.har_files:
+        logging.error("Nothing to discover: pass seed hosts with -f and/or HAR files with -har.")
+        return
+
+    flag = "cidrs" if args.cidrs else "ips"
+    asyncio.run(run_pipeline(
+        args.output, hosts, args.har_files, args.ipv_mode, flag,
+        args.cache, args.only_main, args.depth, args.workers, args.timeout
+    ))
+
+
+if __name__ == "__main__":
+    main()
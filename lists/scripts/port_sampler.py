@@ -0,0 +1,213 @@
+import json, time, logging, ipaddress
+from typing import Callable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from prefixset import PrefixSet
+
+
+ACTIVE_STATES = {"ESTABLISHED", "SYN_SENT", "NONE"}
+
+# new endpoints between two merges into the ipset while sampling
+MERGE_EVERY = 20
+
+# proto, remote ip, remote port, status
+Endpoint = Tuple[str, str, int, str]
+
+
+def parse_ports(spec: str) -> bytearray:
+    """
+    Function, that turns a port spec like '50000-50100,2099' into a 65536-entry lookup table.
+
+    :param spec: Comma-separated ports and inclusive ranges.
+    :type spec: str
+    :return: table[port] == 1 for every selected port.
+    :rtype: bytearray
+    """
+    table = bytearray(65536)
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        low, _, high = part.partition("-")
+        try:
+            first, last = int(low), int(high or low)
+        except ValueError:
+            raise ValueError(f"Invalid port spec: '{part}'")
+        if not 0 < first <= last <= 65535:
+            raise ValueError(f"Port range out of bounds: '{part}'")
+        table[first:last + 1] = b"\x01" * (last - first + 1)
+
+    if not any(table):
+        raise ValueError("Port spec selects no ports.")
+    return table
+
+
+def psutil_kind(proto: str, ipv_mode: str) -> str:
+    """
+    psutil only reads the socket tables it is asked for, so the narrowest kind keeps polls cheap.
+    """
+    base = {"tcp": "tcp", "udp": "udp", "all": "inet"}[proto]
+    return base + {"1": "4", "2": "6", "3": ""}[ipv_mode]
+
+
+def live_snapshots(kind: str, interval: float) -> Iterator[List[Endpoint]]:
+    import psutil, socket
+
+    next_poll = time.monotonic()
+    while True:
+        snapshot = []
+        for conn in psutil.net_connections(kind=kind):
+            if conn.raddr:
+                proto = "tcp" if conn.type == socket.SOCK_STREAM else "udp"
+                snapshot.append((proto, conn.raddr[0], conn.raddr[1], conn.status))
+        yield snapshot
+
+        next_poll += interval
+        delay = next_poll - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_poll = time.monotonic()
+
+
+def replay_snapshots(path: str) -> Iterator[List[Endpoint]]:
+    """
+    Reads snapshots recorded with --record: one JSON object per line,
+    {"time": ..., "connections": [[proto, ip, port, status], ...]}.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield [tuple(conn) for conn in json.loads(line)["connections"]]
+            except (ValueError, KeyError, TypeError):
+                logging.warning(f"{path}:{number}: skipping malformed snapshot.")
+
+
+class PortSampler:
+    """
+    Collects remote endpoints of connections to the selected ports across many snapshots.
+
+    Only endpoints not seen before go through address parsing, so a poll of an
+    unchanged connection table costs one set lookup per matching connection.
+    """
+
+
+    def __init__(self, ports: bytearray, ipv_mode: str = "3") -> None:
+        self.ports = ports
+        self.ipv_mode = ipv_mode
+        self.seen: Set[str] = set()
+        self.ignored: Set[str] = set()
+        self.ips: List[ipaddress._BaseAddress] = []
+        self.polls = 0
+
+
+    def __str__(self):
+        return f"PortSampler({len(self.ips)} ips, {self.polls} polls)"
+
+
+    def feed(self, snapshot: Iterable[Endpoint]) -> List[str]:
+        """
+        Function, that adds one snapshot and returns the newly discovered remote IPs.
+        """
+        self.polls += 1
+        new = []
+
+        for proto, ip, port, status in snapshot:
+            if not self.ports[port] or status not in ACTIVE_STATES:
+                continue
+            if ip in self.seen or ip in self.ignored:
+                continue
+
+            try:
+                address = ipaddress.ip_address(ip.split("%", 1)[0])
+            except ValueError:
+                self.ignored.add(ip)
+                continue
+
+            if getattr(address, "ipv4_mapped", None):
+                address = address.ipv4_mapped
+            wanted = self.ipv_mode == "3" or (address.version == 4) == (self.ipv_mode == "1")
+            if not wanted or not address.is_global:
+                self.ignored.add(ip)
+                continue
+
+            self.seen.add(ip)
+            self.ips.append(address)
+            new.append(f"{address} ({proto}/{port})")
+
+        return new
+
+
+    def prefixes(self, prefix4: int = 32, prefix6: int = 128) -> List[str]:
+        """
+        Collapses the collected IPs into the fewest prefixes, after widening each one to prefix4 / prefix6.
+        """
+        entries = (f"{ip}/{prefix4 if ip.version == 4 else prefix6}" for ip in self.ips)
+        return list(PrefixSet(entries).collapse().lines())
+
+
+def merge_into_ipset(prefixes: List[str], ipset_path: str) -> int:
+    """
+    Function, that adds prefixes not already covered by the ipset file and rewrites it sorted.
+
+    :return: Number of prefixes added.
+    :rtype: int
+    """
+    from get_ipsets import save_entries
+    return save_entries(prefixes, ipset_path, skip_covered=True)
+
+
+def sample(snapshots: Iterator[List[Endpoint]], sampler: PortSampler, duration: Optional[float] = None,
+           record_path: Optional[str] = None, merge: Optional[Callable[[], None]] = None,
+           merge_every: int = MERGE_EVERY) -> None:
+    """
+    Function, that feeds snapshots to the sampler until they run out, duration passes or Ctrl-C.
+    Found addresses are merged as they come, so a long session that gets killed keeps what it saw.
+
+    :param snapshots: Live or replayed snapshots.
+    :type snapshots: Iterator[List[Endpoint]]
+    :param sampler: Sampler to feed.
+    :type sampler: PortSampler
+    :param duration: Seconds to sample, or None for no limit.
+    :type duration: float | None
+    :param record_path: JSON lines file to record every snapshot to, or None.
+    :type record_path: str | None
+    :param merge: Called after every merge_every new endpoints and once more at the end, or None.
+    :type merge: Callable[[], None] | None
+    :param merge_every: New endpoints between two merge calls.
+    :type merge_every: int
+    """
+    record = open(record_path, "a", encoding="utf-8") if record_path else None
+    started = time.monotonic()
+    cpu_started = time.process_time()
+    pending = 0
+
+    try:
+        while duration is None or time.monotonic() - started < duration:
+            snapshot = next(snapshots, None)
+            if snapshot is None:
+                break
+
+            for endpoint in sampler.feed(snapshot):
+                logging.info(f"New endpoint: {endpoint}")
+                pending += 1
+
+            if record:
+                record.write(json.dumps({"time": time.time(), "connections": snapshot}) + "\n")
+
+            if merge and pending >= merge_every:
+                merge()
+                pending = 0
+    except KeyboardInterrupt:
+        logging.info("Sampling stopped.")
+    finally:
+        if record:
+            record.close()
+
+    if merge and pending:
+        merge()
+
+    if sampler.polls:
+        cpu = (time.process_time() - cpu_started) / sampler.polls * 1000
+        logging.info(f"{sampler.polls} poll(s), {cpu:.2f} ms CPU per poll, {len(sampler.ips)} IP(s) found.")
@@ -0,0 +1,280 @@
+import socket, logging
+from array import array
+from bisect import bisect_right
+from heapq import merge
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+def parse_prefix(entry: str, strict: bool = False) -> Tuple[int, int, int]:
+    """
+    Function, that parses an IP or CIDR without ipaddress objects.
+
+    :param entry: '1.2.3.4', '1.2.3.0/24', '2001:db8::/32', ...
+    :type entry: str
+    :param strict: Reject entries with host bits set instead of masking them.
+    :type strict: bool
+    :return: (version, network address as int, prefix length).
+    :rtype: Tuple[int, int, int]
+    """
+    addr, _, length = entry.partition("/")
+    if ":" in addr:
+        family, bits, version = socket.AF_INET6, 128, 6
+    else:
+        family, bits, version = socket.AF_INET, 32, 4
+
+    try:
+        value = int.from_bytes(socket.inet_pton(family, addr), "big")
+        prefix = int(length) if length else bits
+    except (OSError, ValueError):
+        raise ValueError(f"Invalid ipset entry: '{entry}'")
+
+    if not 0 <= prefix <= bits or length and not length.isdigit():
+        raise ValueError(f"Invalid prefix length in '{entry}'")
+
+    host_mask = (1 << (bits - prefix)) - 1
+    if value & host_mask:
+        if strict:
+            raise ValueError(f"Host bits set in '{entry}'")
+        value &= ~host_mask
+    return version, value, prefix
+
+
+def format_prefix(version: int, value: int, length: int, bare_hosts: bool = False) -> str:
+    """
+    Inverse of parse_prefix.
+    """
+    if version == 4:
+        text = socket.inet_ntop(socket.AF_INET, value.to_bytes(4, "big"))
+        return text if bare_hosts and length == 32 else f"{text}/{length}"
+    text = socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, "big"))
+    return text if bare_hosts and length == 128 else f"{text}/{length}"
+
+
+def _intervals(keys: Iterable[int], bits: int) -> Tuple[List[int], List[int]]:
+    """
+    Merges sorted (address << 8 | length) keys into disjoint [start, end] address intervals.
+    """
+    starts, ends = [], []
+    for key in keys:
+        start, length = key >> 8, key & 0xFF
+        end = start | ((1 << (bits - length)) - 1)
+        if ends and start <= ends[-1] + 1:
+            if end > ends[-1]:
+                ends[-1] = end
+        else:
+            starts.append(start)
+            ends.append(end)
+    return starts, ends
+
+
+def _range_keys(ranges: Iterable[Tuple[int, int]], bits: int) -> List[int]:
+    """
+    Cuts [first, last] address ranges into the fewest aligned prefixes, as sorted keys.
+    """
+    keys = []
+    for first, last in ranges:
+        while first <= last:
+            align = (first & -first).bit_length() - 1 if first else bits
+            size = min(align, (last - first + 1).bit_length() - 1)
+            keys.append(first << 8 | (bits - size))
+            first += 1 << size
+    return keys
+
+
+class PrefixSet:
+    """
+    Immutable sorted set of IPv4 / IPv6 prefixes in packed arrays.
+
+    IPv4 networks are kept in an array('I'), IPv6 networks as two array('Q') halves, each with
+    an array('B') of prefix lengths. Entries are unique and sorted by (address, length), so
+    union and difference are linear merges, and writing out needs no sort.
+    Host bits are masked on input: '1.2.3.4/24' and '1.2.3.0/24' are the same entry.
+    """
+    __slots__ = ("_v4", "_v4_len", "_v6_hi", "_v6_lo", "_v6_len", "_index")
+
+
+    def __init__(self, entries: Iterable[str] = ()) -> None:
+        v4, v6 = [], []
+        for entry in entries:
+            version, value, length = parse_prefix(entry.strip())
+            (v4 if version == 4 else v6).append(value << 8 | length)
+        self._set_keys(sorted(set(v4)), sorted(set(v6)))
+
+
+    def _set_keys(self, v4_keys: List[int], v6_keys: List[int]) -> None:
+        self._v4 = array("I", (key >> 8 for key in v4_keys))
+        self._v4_len = array("B", (key & 0xFF for key in v4_keys))
+        self._v6_hi = array("Q", (key >> 72 for key in v6_keys))
+        self._v6_lo = array("Q", (key >> 8 & 0xFFFFFFFFFFFFFFFF for key in v6_keys))
+        self._v6_len = array("B", (key & 0xFF for key in v6_keys))
+        self._index = None
+
+
+    @classmethod
+    def _from_keys(cls, v4_keys: List[int], v6_keys: List[int]) -> "PrefixSet":
+        result = cls.__new__(cls)
+        result._set_keys(v4_keys, v6_keys)
+        return result
+
+
+    def _v4_keys(self) -> Iterator[int]:
+        return (addr << 8 | length for addr, length in zip(self._v4, self._v4_len))
+
+
+    def _v6_keys(self) -> Iterator[int]:
+        return ((hi << 64 | lo) << 8 | length for hi, lo, length in zip(self._v6_hi, self._v6_lo, self._v6_len))
+
+
+    def __str__(self):
+        return f"PrefixSet({len(self._v4)} IPv4, {len(self._v6_len)} IPv6)"
+
+
+    def __len__(self) -> int:
+        return len(self._v4) + len(self._v6_len)
+
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PrefixSet):
+            return NotImplemented
+        return (self._v4, self._v4_len, self._v6_hi, self._v6_lo, self._v6_len) == \
+               (other._v4, other._v4_len, other._v6_hi, other._v6_lo, other._v6_len)
+
+
+    def __iter__(self) -> Iterator[str]:
+        return self.lines()
+
+
+    def lines(self, bare_hosts: bool = False) -> Iterator[str]:
+        """
+        Yields the entries as text, IPv4 first, in address order.
+
+        :param bare_hosts: Write single addresses without '/32' / '/128' (ips-* files).
+        :type bare_hosts: bool
+        """
+        for addr, length in zip(self._v4, self._v4_len):
+            yield format_prefix(4, addr, length, bare_hosts)
+
+        for hi, lo, length in zip(self._v6_hi, self._v6_lo, self._v6_len):
+            yield format_prefix(6, hi << 64 | lo, length, bare_hosts)
+
+
+    def family(self, version: int) -> "PrefixSet":
+        """
+        Only the IPv4 (4) or IPv6 (6) part of the set.
+        """
+        if version == 4:
+            return PrefixSet._from_keys(list(self._v4_keys()), [])
+        return PrefixSet._from_keys([], list(self._v6_keys()))
+
+
+    def union(self, other: "PrefixSet") -> "PrefixSet":
+        def merged(left: Iterator[int], right: Iterator[int]) -> List[int]:
+            result = []
+            for key in merge(left, right):
+                if not result or result[-1] != key:
+                    result.append(key)
+            return result
+
+        return PrefixSet._from_keys(
+            merged(self._v4_keys(), other._v4_keys()),
+            merged(self._v6_keys(), other._v6_keys())
+        )
+
+
+    def difference(self, other: "PrefixSet") -> "PrefixSet":
+        """
+        Entries of this set that are not entries of other (exact match, not coverage).
+        """
+        def removed(left: Iterator[int], right: Iterator[int]) -> List[int]:
+            result = []
+            drop = next(right, None)
+            for key in left:
+                while drop is not None and drop < key:
+                    drop = next(right, None)
+                if key != drop:
+                    result.append(key)
+            return result
+
+        return PrefixSet._from_keys(
+            removed(self._v4_keys(), other._v4_keys()),
+            removed(self._v6_keys(), other._v6_keys())
+        )
+
+
+    __or__ = union
+    __sub__ = difference
+
+
+    def ranges(self, version: int) -> List[Tuple[int, int]]:
+        """
+        Disjoint [first, last] address ranges covered by the IPv4 (4) or IPv6 (6) part, adjacent ones merged.
+        """
+        if version == 4:
+            starts, ends = _intervals(self._v4_keys(), 32)
+        else:
+            starts, ends = _intervals(self._v6_keys(), 128)
+        return list(zip(starts, ends))
+
+
+    def collapse(self) -> "PrefixSet":
+        """
+        The fewest prefixes covering the same addresses: nested entries dropped, adjacent ones
+        joined ('10.0.0.0/24' + '10.0.1.0/24' -> '10.0.0.0/23'), like ipaddress.collapse_addresses.
+        """
+        return PrefixSet._from_keys(_range_keys(self.ranges(4), 32), _range_keys(self.ranges(6), 128))
+
+
+    def __contains__(self, entry: str) -> bool:
+        """
+        True if the address or whole prefix is covered by the set, e.g. '1.2.3.4' in {'1.2.0.0/16'}.
+        """
+        version, value, length = parse_prefix(entry)
+        bits = 32 if version == 4 else 128
+
+        if self._index is None:
+            self._index = (_intervals(self._v4_keys(), 32), _intervals(self._v6_keys(), 128))
+        starts, ends = self._index[0] if version == 4 else self._index[1]
+
+        position = bisect_right(starts, value) - 1
+        return position >= 0 and value | ((1 << (bits - length)) - 1) <= ends[position]
+
+
+def read_prefix_file(path: str, strict: bool = True) -> Tuple[PrefixSet, Optional[bool], List[str]]:
+    """
+    Function, that loads an ipset / ips-* file for rewriting.
+
+    Comments, unparsable lines and (if strict) entries with host bits set ('1.2.3.4/24')
+    are not entries of the set; they are returned verbatim, so a rewrite carries them
+    through unchanged instead of dropping or masking them (lint_lists.py reports them).
+
+    :param path: Path to the file.
+    :type path: str
+    :param strict: Keep entries with host bits set verbatim instead of masking them into the set.
+    :type strict: bool
+    :return: The entries, whether single addresses in the file are written bare
+             (None if it has none), so rewriting keeps the file's style, and the kept lines.
+    :rtype: Tuple[PrefixSet, bool | None, List[str]]
+    """
+    v4, v6, kept, bare, slashed = [], [], [], 0, 0
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                kept.append(line)
+                continue
+            try:
+                version, value, length = parse_prefix(line, strict)
+            except ValueError as e:
+                logging.warning(f"{path}:{number}: {e}, keeping the line as is")
+                kept.append(line)
+                continue
+            (v4 if version == 4 else v6).append(value << 8 | length)
+            if "/" not in line:
+                bare += 1
+            elif line.endswith(("/32", "/128")):
+                slashed += 1
+
+    prefixes = PrefixSet._from_keys(sorted(set(v4)), sorted(set(v6)))
+    return prefixes, (bare >= slashed if bare or slashed else None), kept
@@ -0,0 +1,296 @@
+import os, re, shlex, logging, hashlib
+from typing import Dict, List, Optional, Tuple
+from service import Service
+from remove_dup_hosts import is_covered
+from prefixset import PrefixSet, parse_prefix
+
+
+FILTER_ARGS = ("--filter-tcp", "--filter-udp", "--filter-l3", "--filter-l7")
+LIST_ARGS = ("--hostlist", "--hostlist-exclude", "--ipset", "--ipset-exclude")
+GLOBAL_PREFIX = "--wf-"
+
+
+class Section:
+    """
+    One '--new'-separated winws section: its filters, list files and remaining desync args.
+    """
+
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.filters: List[Tuple[str, str]] = []
+        self.lists: Dict[str, List[str]] = {name: [] for name in LIST_ARGS}
+        self.args: List[Tuple[str, Optional[str]]] = []
+
+
+    def __str__(self):
+        return f"Section({self.index}, {self.signature()})"
+
+
+    def signature(self) -> str:
+        return " ".join(f"{name[len('--filter-'):]}={value}" for name, value in self.filters) or "any"
+
+
+class Profile:
+    """
+    Structured model of a profile's winws command line.
+    """
+
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.name = os.path.splitext(os.path.basename(path))[0]
+        self.global_args: List[Tuple[str, Optional[str]]] = []
+        self.sections: List[Section] = []
+
+
+    def __str__(self):
+        return f"Profile({self.name}, {len(self.sections)} sections)"
+
+
+SET_RE = re.compile(r'^\s*set\s+"(\w+)=([^"]*)"', re.IGNORECASE)
+
+
+def read_profile(path: str, variables: Dict[str, str]) -> str:
+    """
+    Returns the winws argument string of a profile, with '^' line continuations joined.
+    'set "NAME=value"' lines seen before the command are added to variables.
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+
+    text = re.sub(r"\^[ \t]*\r?\n", " ", text)
+    for line in text.splitlines():
+        match = SET_RE.match(line)
+        if match:
+            variables[match.group(1)] = expand(match.group(2), variables)
+            continue
+
+        marker = line.lower().find('winws.exe"')
+        if marker != -1:
+            return line[marker + len('winws.exe"'):]
+
+    raise ValueError(f"No winws.exe command found in '{path}'.")
+
+
+def expand(value: str, variables: Dict[str, str]) -> str:
+    value = value.replace("%~dp0", variables["~dp0"])
+    return re.sub(r"%(\w+)%", lambda m: variables.get(m.group(1), m.group(0)), value).replace("\\", os.sep)
+
+
+def parse_profile(path: str, game_filter: str = "0", hide_switch: str = "default") -> Profile:
+    """
+    Function, that parses a profile .bat into a Profile model.
+
+    :param path: Path to the profile.
+    :type path: str
+    :param game_filter: Value substituted for %GameFilter% ('0' when the game filter is off).
+    :type game_filter: str
+    :param hide_switch: Value substituted for %HideSwitchStatus% ('default' or 'hide').
+    :type hide_switch: str
+    :return: Parsed profile.
+    :rtype: Profile
+    """
+    variables = {
+        "~dp0": os.path.dirname(os.path.abspath(path)) + os.sep,
+        "GameFilter": game_filter,
+        "HideSwitchStatus": hide_switch,
+    }
+
+    lexer = shlex.shlex(read_profile(path, variables), posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ""
+
+    profile = Profile(path)
+    section = Section(0)
+
+    for token in lexer:
+        if token == "--new":
+            profile.sections.append(section)
+            section = Section(len(profile.sections))
+            continue
+
+        name, sep, value = token.partition("=")
+        value = expand(value, variables) if sep else None
+
+        if name.startswith(GLOBAL_PREFIX):
+            profile.global_args.append((name, value))
+        elif name in FILTER_ARGS:
+            section.filters.append((name, value))
+        elif name in LIST_ARGS:
+            section.lists[name].append(value)
+        else:
+            section.args.append((name, value))
+
+    profile.sections.append(section)
+    return profile
+
+
+def read_hosts(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8-sig") as f:
+        return [host.lower().rstrip(".") for line in f for host in line.split() if not host.startswith("#")]
+
+
+def read_networks(path: str) -> List[str]:
+    networks = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                parse_prefix(line)
+            except ValueError:
+                logging.warning(f"{path}:{number}: skipping invalid entry '{line}'")
+                continue
+            networks.append(line)
+    return networks
+
+
+def merge_hostlists(paths: List[str]) -> Tuple[int, List[str]]:
+    """
+    Merges hostlists, drops duplicates and subdomains of listed domains. Returns (raw count, merged).
+    """
+    hosts = [host for path in paths for host in read_hosts(path)]
+    merged = set()
+    for host in sorted(set(hosts), key=lambda h: (h.count("."), h)):
+        if not is_covered(host, merged):
+            merged.add(host)
+    return len(hosts), sorted(merged)
+
+
+def merge_ipsets(paths: List[str]) -> Tuple[int, List[str]]:
+    """
+    Merges ipsets and collapses them into the minimal prefix list. Returns (raw count, merged).
+    """
+    networks = [net for path in paths for net in read_networks(path)]
+    return len(networks), list(PrefixSet(networks).collapse().lines())
+
+
+def effective_lists(profile: Profile) -> List[Dict[str, Tuple[int, List[str]]]]:
+    """
+    Merged entries of every list kind for each section, computed once per distinct set of source files.
+    """
+    memo: Dict[Tuple[str, Tuple[str, ...]], Tuple[int, List[str]]] = {}
+    result = []
+
+    for section in profile.sections:
+        merged = {}
+        for kind, paths in section.lists.items():
+            if not paths:
+                continue
+            key = (kind, tuple(sorted(set(paths))))
+            if key not in memo:
+                merge = merge_ipsets if kind.startswith("--ipset") else merge_hostlists
+                memo[key] = merge(list(key[1]))
+            merged[kind] = memo[key]
+        result.append(merged)
+
+    return result
+
+
+def quote(name: str, value: Optional[str]) -> str:
+    if value is None:
+        return name
+    if re.search(r'[\s"\\%^&|<>]', value):
+        return f'{name}="{value}"'
+    return f"{name}={value}"
+
+
+def compile_profile(profile: Profile, output_dir: str, write: bool = True) -> List[Dict[str, Tuple[int, List[str]]]]:
+    """
+    Function, that writes one merged list per section and list kind, plus a winws args file using them.
+
+    Identical merged lists (e.g. the same hostlist in several sections) are written once,
+    under a name derived from their content.
+
+    :param profile: Parsed profile.
+    :type profile: Profile
+    :param output_dir: Directory for '<profile name>/' output.
+    :type output_dir: str
+    :param write: Only report, do not write anything.
+    :type write: bool
+    :return: Per-section merged lists as returned by effective_lists.
+    :rtype: List[Dict[str, Tuple[int, List[str]]]]
+    """
+    sections = effective_lists(profile)
+    target = os.path.join(output_dir, profile.name)
+    if write:
+        os.makedirs(target, exist_ok=True)
+
+    args = [quote(name, value) for name, value in profile.global_args]
+
+    for section, merged in zip(profile.sections, sections):
+        if section.index:
+            args.append("--new")
+        args += [quote(name, value) for name, value in section.filters]
+
+        for kind, (raw, entries) in merged.items():
+            digest = hashlib.sha256("\n".join(entries).encode()).hexdigest()[:8]
+            list_path = os.path.abspath(os.path.join(target, f"{kind.lstrip('-')}-{digest}.txt"))
+            if write and not os.path.exists(list_path):
+                Service.write_atomic(list_path, entries)
+            args.append(quote(kind, list_path))
+
+        args += [quote(name, value) for name, value in section.args]
+
+    if write:
+        Service.write_atomic(os.path.join(target, "winws.args"), args)
+        logging.info(f"Compiled {profile.name} into {target}")
+
+    return sections
+
+
+def report(profile: Profile, sections: List[Dict[str, Tuple[int, List[str]]]]) -> None:
+    logging.info(f"{profile.name}: {len(profile.sections)} section(s)")
+    for section, merged in zip(profile.sections, sections):
+        counts = ", ".join(
+            f"{kind.lstrip('-')} {raw} -> {len(entries)}" for kind, (raw, entries) in merged.items()
+        ) or "no lists"
+        logging.info(f"  [{section.index}] {section.signature()}: {counts}")
+
+
+def diff_profiles(first: Profile, second: Profile) -> None:
+    """
+    Compares effective coverage per filter signature and list kind between two profiles.
+    """
+    def coverage(profile: Profile) -> Dict[Tuple[str, str], set]:
+        result: Dict[Tuple[str, str], set] = {}
+        for section, merged in zip(profile.sections, effective_lists(profile)):
+            for kind, (_, entries) in merged.items():
+                result.setdefault((section.signature(), kind), set()).update(entries)
+        return result
+
+    left, right = coverage(first), coverage(second)
+    logging.info(f"Coverage diff {first.name} -> {second.name}:")
+
+    for key in sorted(set(left) | set(right)):
+        removed, added = left.get(key, set()) - right.get(key, set()), right.get(key, set()) - left.get(key, set())
+        if removed or added:
+            logging.info(f"  {key[0]} {key[1].lstrip('-')}: +{len(added)} -{len(removed)}")
+            for entry in sorted(added)[:10]:
+                logging.debug(f"    + {entry}")
+            for entry in sorted(removed)[:10]:
+                logging.debug(f"    - {entry}")
+
+
+def main() -> None:
+    service = Service("profile")
+    Service.setup_logging()
+    args = service.argparse().parse_args()
+
+    profiles = [parse_profile(Service.find_file(name), args.game_filter, args.hide_switch) for name in args.profiles]
+
+    if args.diff:
+        if len(profiles) != 2:
+            logging.error("--diff needs exactly two profiles.")
+            return
+        diff_profiles(*profiles)
+        return
+
+    for profile in profiles:
+        report(profile, compile_profile(profile, args.output, write=not args.report_only))
+
+
+if __name__ == "__main__":
+    main()
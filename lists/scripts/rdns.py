@@ -0,0 +1,333 @@
+import os, json, random, struct, logging, ipaddress
+from itertools import islice
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from service import Service
+
+
+RDNS_CACHE_FILE = "rdns_cache.json"
+DEFAULT_NAMESERVER = "1.1.1.1"
+# host addresses looked up from every prefix wider than one address
+HOSTS_PER_PREFIX = 4
+
+TYPE_PTR = 12
+CLASS_IN = 1
+RCODE_NXDOMAIN = 3
+HEADER = struct.Struct("!HHHHHH")
+
+
+def build_query(qid: int, name: str) -> bytes:
+    """
+    Builds a recursive PTR query for name.
+    """
+    qname = b"".join(bytes([len(label)]) + label.encode("ascii") for label in name.rstrip(".").split("."))
+    return HEADER.pack(qid, 0x0100, 1, 0, 0, 0) + qname + b"\0" + struct.pack("!HH", TYPE_PTR, CLASS_IN)
+
+
+def read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """
+    Reads a possibly compressed domain name, returns (name, offset after the name in the original position).
+    """
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return ".".join(labels), end if end is not None else offset
+        labels.append(data[offset:offset + length].decode("ascii", errors="replace"))
+        offset += length
+    raise ValueError("Compression loop in DNS name.")
+
+
+def parse_response(data: bytes) -> Tuple[int, int, str, List[str]]:
+    """
+    Function, that parses a DNS response.
+
+    :param data: Raw UDP payload.
+    :type data: bytes
+    :return: Query id, rcode, question name and the PTR targets from the answer section.
+    :rtype: Tuple[int, int, str, List[str]]
+    """
+    qid, flags, qdcount, ancount, _, _ = HEADER.unpack_from(data)
+    offset = HEADER.size
+    question = ""
+    for _ in range(qdcount):
+        question, offset = read_name(data, offset)
+        offset += 4
+
+    names = []
+    for _ in range(ancount):
+        _, offset = read_name(data, offset)
+        rtype, _, _, rdlength = struct.unpack_from("!HHIH", data, offset)
+        offset += 10
+        if rtype == TYPE_PTR:
+            names.append(read_name(data, offset)[0])
+        offset += rdlength
+
+    return qid, flags & 0x000F, question.lower(), names
+
+
+def parse_nameserver(value: str) -> Tuple[str, int]:
+    """
+    Accepts '1.1.1.1', '127.0.0.1:5353', '::1' or '[::1]:5353'.
+    """
+    if value.startswith("["):
+        host, _, port = value[1:].partition("]:")
+        return host.rstrip("]"), int(port or 53)
+    if value.count(":") == 1:
+        host, _, port = value.partition(":")
+        return host, int(port)
+    return value, 53
+
+
+def default_nameserver() -> str:
+    try:
+        with open("/etc/resolv.conf", "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    return parts[1]
+    except OSError:
+        pass
+    return DEFAULT_NAMESERVER
+
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+    """
+    One UDP socket shared by all lookups; answers are matched to queries by id and question.
+    """
+
+
+    def __init__(self) -> None:
+        self.pending: Dict[int, Tuple[str, asyncio.Future]] = {}
+
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        try:
+            qid, rcode, question, names = parse_response(data)
+        except (struct.error, IndexError, ValueError):
+            logging.debug(f"Dropping malformed DNS response from {addr}.")
+            return
+
+        entry = self.pending.get(qid)
+        if entry is None or entry[0] != question or entry[1].done():
+            return
+        entry[1].set_result((rcode, names))
+
+
+    def error_received(self, exc: Exception) -> None:
+        logging.debug(f"DNS socket error: {exc}")
+
+
+class ReverseResolver:
+    """
+    Async bulk PTR resolver: bounded concurrency, per-query timeout with retries, persistent cache.
+
+    Cached values are the hostname, or '' for addresses without a PTR record (NXDOMAIN / empty answer).
+    Timeouts and server failures are not cached.
+
+    :param nameserver: 'host' or 'host:port' of the DNS server to ask.
+    :type nameserver: str
+    :param concurrency: Max queries in flight.
+    :type concurrency: int
+    :param timeout: Seconds to wait for one answer before resending.
+    :type timeout: float
+    :param retries: Resends after the first attempt.
+    :type retries: int
+    """
+
+
+    def __init__(self, nameserver: Optional[str] = None, concurrency: int = 200, timeout: float = 2.0, retries: int = 2,
+                 cache: Optional[Dict[str, str]] = None) -> None:
+        self.nameserver = parse_nameserver(nameserver or default_nameserver())
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.cache: Dict[str, str] = cache if cache is not None else {}
+        self._transport: Optional[asyncio.DatagramTransport] = None
+        self._protocol: Optional[_DnsProtocol] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+
+    def __str__(self):
+        return f"ReverseResolver({self.nameserver[0]}:{self.nameserver[1]}, cached={len(self.cache)})"
+
+
+    async def __aenter__(self) -> "ReverseResolver":
+        loop = asyncio.get_running_loop()
+        self._transport, self._protocol = await loop.create_datagram_endpoint(_DnsProtocol, remote_addr=self.nameserver)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._transport.close()
+
+
+    async def lookup(self, ip: str) -> Optional[str]:
+        """
+        Function, that resolves one address to its PTR hostname.
+
+        :param ip: IPv4 or IPv6 address.
+        :type ip: str
+        :return: Hostname, '' if the address has none, None if the server did not answer.
+        :rtype: str | None
+        """
+        if ip in self.cache:
+            return self.cache[ip]
+
+        name = ipaddress.ip_address(ip).reverse_pointer
+        loop = asyncio.get_running_loop()
+
+        async with self._semaphore:
+            qid = random.getrandbits(16)
+            while qid in self._protocol.pending:
+                qid = random.getrandbits(16)
+            future = loop.create_future()
+            self._protocol.pending[qid] = (name, future)
+            query = build_query(qid, name)
+
+            try:
+                for _ in range(self.retries + 1):
+                    self._transport.sendto(query)
+                    try:
+                        rcode, names = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+                        break
+                    except asyncio.TimeoutError:
+                        continue
+                else:
+                    logging.debug(f"PTR lookup for {ip} timed out.")
+                    return None
+            finally:
+                del self._protocol.pending[qid]
+
+        if rcode == RCODE_NXDOMAIN or rcode == 0:
+            host = names[0].rstrip(".").lower() if names else ""
+            self.cache[ip] = host
+            return host
+
+        logging.debug(f"PTR lookup for {ip} failed with rcode {rcode}.")
+        return None
+
+
+def load_rdns_cache() -> Dict[str, str]:
+    if os.path.exists(RDNS_CACHE_FILE):
+        with open(RDNS_CACHE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_rdns_cache(cache: Dict[str, str]) -> None:
+    Service.write_atomic(RDNS_CACHE_FILE, [json.dumps(cache, indent=2)])
+
+
+def read_ips(path: str, per_prefix: int = HOSTS_PER_PREFIX) -> List[str]:
+    """
+    Function, that reads the addresses to look up from an ips-* / ipset file.
+
+    A prefix wider than one address is sampled by its first per_prefix host addresses:
+    a handful of PTR records usually names the network owner, and a /12 would be a million queries.
+
+    :param path: ips-* or ipset file.
+    :type path: str
+    :param per_prefix: Host addresses to take from every wider prefix, 0 to skip such prefixes.
+    :type per_prefix: int
+    :return: Unique addresses, in file order.
+    :rtype: List[str]
+    """
+    ips, sampled, skipped = [], 0, 0
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                net = ipaddress.ip_network(line, strict=False)
+            except ValueError:
+                continue
+            if net.num_addresses == 1:
+                ips.append(str(net.network_address))
+            elif per_prefix > 0:
+                ips += [str(ip) for ip in islice(net.hosts(), per_prefix)]
+                sampled += 1
+            else:
+                skipped += 1
+
+    if sampled:
+        logging.info(f"Sampled the first {per_prefix} host(s) of {sampled} prefix(es) wider than a single address.")
+    if skipped:
+        logging.info(f"Skipped {skipped} prefix(es) wider than a single address.")
+    return list(dict.fromkeys(ips))
+
+
+async def attribute(ips: List[str], resolver: ReverseResolver) -> Dict[str, Optional[str]]:
+    """
+    Function, that resolves all addresses concurrently.
+
+    :return: ip -> hostname ('' without PTR, None on timeout).
+    :rtype: Dict[str, Optional[str]]
+    """
+    async with resolver:
+        hosts = await asyncio.gather(*(resolver.lookup(ip) for ip in ips))
+    return dict(zip(ips, hosts))
+
+
+def main() -> None:
+    service = Service("rdns")
+    Service.setup_logging()
+    args = service.argparse().parse_args()
+
+    try:
+        input_path = Service.find_file(args.filename)
+    except FileNotFoundError as e:
+        logging.error(str(e))
+        return
+
+    ips = read_ips(input_path, args.per_prefix)
+    cache = load_rdns_cache() if args.cache else {}
+    resolver = ReverseResolver(args.nameserver, args.workers, args.timeout, args.retries, cache)
+
+    import time
+    started = time.monotonic()
+    try:
+        result = asyncio.run(attribute(ips, resolver))
+    finally:
+        if args.cache:
+            save_rdns_cache(resolver.cache)
+
+    resolved = {ip: host for ip, host in result.items() if host}
+    failed = sum(1 for host in result.values() if host is None)
+    logging.info(
+        f"{len(resolved)}/{len(ips)} address(es) resolved via {resolver.nameserver[0]} "
+        f"in {time.monotonic() - started:.2f}s, {failed} timed out."
+    )
+
+    output = args.output or os.path.join(os.path.dirname(input_path), f"hosts-{os.path.basename(input_path)}")
+    Service.write_atomic(output, (f"{host} : {ip}" if host else ip for ip, host in result.items()))
+    logging.info(f"Saved {len(result)} line(s) to {output}")
+
+    if args.hostlist and resolved:
+        from remove_dup_hosts import is_covered, only_main_dom
+        from pipeline import load_hostlist, append_hostlist
+
+        hosts = list(dict.fromkeys(resolved.values()))
+        if args.only_main:
+            hosts = list(dict.fromkeys(only_main_dom(hosts)))
+        known = set(load_hostlist(args.hostlist))
+        new = []
+        for host in sorted(hosts, key=lambda h: (h.count("."), h)):
+            if not is_covered(host, known):
+                known.add(host)
+                new.append(host)
+        append_hostlist(args.hostlist, new)
+        logging.info(f"{len(new)} new domain(s) added to {args.hostlist}")
+
+
+if __name__ == "__main__":
+    main()
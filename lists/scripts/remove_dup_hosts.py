@@ -1,13 +1,9 @@
-import os, logging, tldextract
-from typing import Tuple, List
+import os, logging
+from typing import Tuple, List, Set
 from service import Service
 
 
 
-service = Service("dup-hosts")
-logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
-
-
 priority_substrings = [
     "yt",
     "youtu",
@@ -23,7 +19,7 @@ priority_substrings = [
 ]
 
 
-@service.log_file_change
+@Service.log_file_change
 def remove_duplicates(filepath: str, only_main: bool) -> None:
     def sort_key(line: str) -> Tuple[int, str]:
         for index, substring in enumerate(priority_substrings):
@@ -50,6 +46,7 @@ def remove_duplicates(filepath: str, only_main: bool) -> None:
 
 
 def only_main_dom(domains: List[str]) -> list:
+    import tldextract
     res = []
 
     for dom in domains:
@@ -59,10 +56,21 @@ def only_main_dom(domains: List[str]) -> list:
     return res
 
 
+def is_covered(domain: str, domains: Set[str]) -> bool:
+    """
+    Checks whether a domain or any of its parent domains is already in the set.
+    winws hostlists match subdomains, so a covered domain is redundant.
+    """
+    labels = domain.split(".")
+    return any(".".join(labels[i:]) in domains for i in range(len(labels)))
+
+
 def main() -> None:
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    service = Service("dup-hosts")
+    Service.setup_logging()
     args = service.argparse().parse_args()
-    filepath = service.find_file(args.filename)
+    filepath = Service.find_file(args.filename)
     only_main = args.only_main
     remove_duplicates(filepath, only_main)
 
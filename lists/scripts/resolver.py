@@ -0,0 +1,111 @@
+import socket, logging, ipaddress
+import asyncio
+from typing import Dict, List, Optional, Set, Tuple
+
+
+EXCLUDED_IPS = {'1.1.1.1', '8.8.8.8', '8.8.4.4', '192.168.0.1'}
+
+# the name or record type does not exist; anything else (EAI_AGAIN, timeouts) may work on retry
+PERMANENT_GAI_ERRORS = {
+    code for code in (getattr(socket, "EAI_NONAME", None), getattr(socket, "EAI_NODATA", None)) if code is not None
+}
+
+
+class Resolver:
+    """
+    In-process async resolver with bounded concurrency and a per-run cache.
+
+    Complete answers are cached, also empty ones (NXDOMAIN, no records). A lookup that
+    timed out or failed temporarily is not cached, its domain is kept in failed and is
+    tried again on the next resolve().
+
+    :param ipv_mode: 1 = IPv4, 2 = IPv6, 3 = both.
+    :type ipv_mode: str
+    :param concurrency: Max lookups in flight.
+    :type concurrency: int
+    :param timeout: Per-lookup timeout in seconds.
+    :type timeout: float
+    """
+
+
+    def __init__(self, ipv_mode: str = "3", concurrency: int = 50, timeout: float = 5.0) -> None:
+        self.ipv_mode = ipv_mode
+        self.timeout = timeout
+        self.cache: Dict[str, Tuple[List[str], List[str]]] = {}
+        self.failed: Set[str] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._concurrency = concurrency
+
+
+    def __str__(self):
+        return f"Resolver(ipv_mode={self.ipv_mode}, cached={len(self.cache)})"
+
+
+    def families(self) -> List[int]:
+        result = []
+        if self.ipv_mode in ("1", "3"):
+            result.append(socket.AF_INET)
+        if self.ipv_mode in ("2", "3"):
+            result.append(socket.AF_INET6)
+        return result
+
+
+    async def _lookup(self, domain: str, family: int) -> Optional[List[str]]:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(domain, None, family=family, type=socket.SOCK_STREAM),
+                self.timeout
+            )
+        except socket.gaierror as e:
+            logging.debug(f"Could not resolve {domain} ({family.name}): {e}")
+            return [] if e.errno in PERMANENT_GAI_ERRORS else None
+        except UnicodeError as e:
+            logging.debug(f"Could not resolve {domain} ({family.name}): {e}")
+            return []
+        except asyncio.TimeoutError:
+            logging.debug(f"Lookup of {domain} ({family.name}) timed out.")
+            return None
+
+        ips = []
+        for info in infos:
+            ip = info[4][0].split("%")[0]
+            ip_obj = ipaddress.ip_address(ip)
+            if ip in EXCLUDED_IPS or ip_obj.is_link_local or ip_obj.is_unspecified:
+                continue
+            if ip not in ips:
+                ips.append(ip)
+        return ips
+
+
+    async def resolve(self, domain: str, refresh: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Resolves a domain into (ipv4, ipv6) lists, using the cache unless refresh is set.
+
+        :param domain: Domain to resolve.
+        :type domain: str
+        :param refresh: Ignore a cached answer.
+        :type refresh: bool
+        :return: IPv4 and IPv6 addresses.
+        :rtype: Tuple[List[str], List[str]]
+        """
+        domain = domain.strip().lower()
+        if not refresh and domain in self.cache:
+            return self.cache[domain]
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+
+        async with self._semaphore:
+            answers = await asyncio.gather(*(self._lookup(domain, family) for family in self.families()))
+
+        ipv4_list, ipv6_list = [], []
+        for family, ips in zip(self.families(), answers):
+            (ipv4_list if family == socket.AF_INET else ipv6_list).extend(ips or [])
+
+        if None in answers:
+            self.failed.add(domain)
+        else:
+            self.failed.discard(domain)
+            self.cache[domain] = (ipv4_list, ipv6_list)
+        return ipv4_list, ipv6_list
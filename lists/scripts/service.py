@@ -1,6 +1,7 @@
 import os
 import argparse
-from typing import Callable
+import tempfile
+from typing import Callable, Iterable
 from functools import wraps
 import logging
 
@@ -18,6 +19,8 @@ class Service:
 
     def argparse(self) -> argparse.ArgumentParser:
         if self.service_name == "ipset":
+            from port_sampler import MERGE_EVERY
+
             parser = argparse.ArgumentParser(
             description="Domain to IP resolver and deduplicator"
             )
@@ -38,12 +41,75 @@ class Service:
                 help="Enable and choose testmode ('nslookup')"
             )
 
+            parser.add_argument(
+                "--resume",
+                action="store_true",
+                help="Continue an interrupted CIDR lookup from its journal instead of starting over"
+            )
+
             parser.add_argument(
                 "-pn",
                 "--port_number",
-                default=2099,
+                default="2099",
+                type=str,
+                help="Remote port(s) and ranges to sample in mode 3, e.g. '50000-50100,2099' (default: 2099)"
+            )
+
+            parser.add_argument(
+                "-pr",
+                "--proto",
+                choices=["tcp", "udp", "all"],
+                default="all",
+                help="Connection protocol to sample in mode 3 (default: all)"
+            )
+
+            parser.add_argument(
+                "-dur",
+                "--duration",
+                default=None,
+                type=float,
+                help="Seconds to sample in mode 3 (default: until Ctrl-C)"
+            )
+
+            parser.add_argument(
+                "-o",
+                "--output",
+                default="ipset-ports.txt",
+                help="Ipset to merge sampled addresses into in mode 3 (default: ipset-ports.txt)"
+            )
+
+            parser.add_argument(
+                "--prefix4",
+                default=32,
                 type=int,
-                help="Port number value, if port mode enabled"
+                help="Widen sampled IPv4 addresses to this prefix length before merging, mode 3 (default: 32)"
+            )
+
+            parser.add_argument(
+                "--prefix6",
+                default=128,
+                type=int,
+                help="Widen sampled IPv6 addresses to this prefix length before merging, mode 3 (default: 128)"
+            )
+
+            parser.add_argument(
+                "--merge-every",
+                dest="merge_every",
+                default=MERGE_EVERY,
+                type=int,
+                help=f"Mode 3: merge into the ipset after this many new endpoints, not only at the end (default: {MERGE_EVERY})"
+            )
+
+            parser.add_argument(
+                "--record",
+                default=None,
+                help="Mode 3: also append every connection snapshot to this JSON lines file"
+            )
+
+            parser.add_argument(
+                "--replay",
+                default=None,
+                help="Mode 3: read snapshots recorded with --record instead of live connections"
             )
 
 
@@ -59,7 +125,7 @@ class Service:
                 dest="mode",
                 choices=["1", "2", "3"],
                 required=True,
-                help="Mode: 1 = deduplicate & sort, 2 = resolve & update ipset, 3 = get ip addres using external port"
+                help="Mode: 1 = deduplicate & sort, 2 = resolve & update ipset, 3 = sample remote ips of connections on given ports"
             )
 
 
@@ -78,6 +144,29 @@ class Service:
                 help="IP version: 1 = IPv4, 2 = IPv6, 3 = both (required for mode 2)"
             )
 
+            parser.add_argument(
+                "-w",
+                "--watch",
+                nargs="?",
+                const=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir),
+                default=None,
+                help="Mode 2 only: keep running and regenerate outputs when list-*/hostlist-* files in this directory change (default: lists/)"
+            )
+
+            parser.add_argument(
+                "--debounce",
+                default=1.0,
+                type=float,
+                help="Seconds of quiet after a change before regenerating, watch mode (default: 1)"
+            )
+
+            parser.add_argument(
+                "--interval",
+                default=1.0,
+                type=float,
+                help="Polling interval: connection sampler in mode 3, watch mode when inotify is unavailable (default: 1)"
+            )
+
             group = parser.add_mutually_exclusive_group()
 
             group.add_argument(
@@ -111,10 +200,65 @@ class Service:
                 dest="browser",
                 choices=["chrome", "firefox", "edge"],
                 default="chrome",
-                required=True,
                 help="Browser mode: chrome, firefox, edge (default: chrome)"
             )
 
+            parser.add_argument(
+                "-e",
+                "--engine",
+                choices=["selenium", "http"],
+                default="selenium",
+                help="Crawler engine: selenium = real browser, http = lightweight aiohttp crawler (default: selenium)"
+            )
+
+            parser.add_argument(
+                "-d",
+                "--depth",
+                default=2,
+                type=int,
+                help="Link depth for same-site pages, scripts and stylesheets, http engine only (default: 2)"
+            )
+
+            parser.add_argument(
+                "-w",
+                "--workers",
+                default=4,
+                type=int,
+                help="Number of parallel browser sessions or HTTP requests (default: 4)"
+            )
+
+            parser.add_argument(
+                "-q",
+                "--quiet",
+                default=2.0,
+                type=float,
+                help="Seconds without new resource requests before a page counts as loaded (default: 2)"
+            )
+
+            parser.add_argument(
+                "-t",
+                "--timeout",
+                default=15.0,
+                type=float,
+                help="Max seconds to wait for network quiet on a single host, or per request with the http engine (default: 15)"
+            )
+
+            parser.add_argument(
+                "-har",
+                "--import",
+                dest="har_files",
+                nargs="+",
+                default=None,
+                help="Extract hostnames from HAR / Chrome net-export file(s) instead of crawling"
+            )
+
+            parser.add_argument(
+                "-o",
+                "--output",
+                default=None,
+                help="Hostlist to merge found domains into (default: write bc-args-list.txt)"
+            )
+
         elif self.service_name == "dup-hosts":
             parser = argparse.ArgumentParser (
             description="Hostlist deduplicator"
@@ -134,13 +278,409 @@ class Service:
                 help='Boolean param that allows you to filter sundomains (default: False).'
             )
 
+        elif self.service_name == "pipeline":
+            parser = argparse.ArgumentParser(
+            description="Domain discovery -> hostlist -> ipset pipeline"
+            )
+
+            parser.add_argument(
+                "-f",
+                dest="filename",
+                default=None,
+                help="File with seed host(s) to crawl with the http engine"
+            )
+
+            parser.add_argument(
+                "-har",
+                "--import",
+                dest="har_files",
+                nargs="+",
+                default=None,
+                help="HAR / Chrome net-export file(s) to extract hostnames from"
+            )
+
+            parser.add_argument(
+                "-o",
+                "--output",
+                required=True,
+                help="Hostlist to merge discovered domains into; ipsets are written next to it"
+            )
+
+            parser.add_argument(
+                "-ip",
+                dest="ipv_mode",
+                choices=["1", "2", "3"],
+                default="1",
+                help="IP version: 1 = IPv4, 2 = IPv6, 3 = both (default: 1)"
+            )
+
+            parser.add_argument(
+                '-ch',
+                '--cache',
+                action='store_true',
+                help="Enable CIDR cache"
+            )
+
+            parser.add_argument(
+                '-om',
+                dest='only_main',
+                action='store_true',
+                help='Reduce discovered domains to their main domain'
+            )
+
+            parser.add_argument(
+                "-d",
+                "--depth",
+                default=2,
+                type=int,
+                help="Link depth for same-site pages, scripts and stylesheets (default: 2)"
+            )
+
+            parser.add_argument(
+                "-w",
+                "--workers",
+                default=10,
+                type=int,
+                help="Number of parallel HTTP requests (default: 10)"
+            )
+
+            parser.add_argument(
+                "-t",
+                "--timeout",
+                default=10.0,
+                type=float,
+                help="Per-request timeout in seconds (default: 10)"
+            )
+
+            group = parser.add_mutually_exclusive_group()
+
+            group.add_argument(
+                "-c", 
+                "--cidrs", 
+                action="store_true", 
+                help="Save as CIDR"
+            )
+
+            group.add_argument(
+                "-i",
+                "--ips", 
+                action="store_true", 
+                help="Save as IP"
+            )
+
+        elif self.service_name == "delta":
+            from ipset_delta import IPSET_ALL_URL
+
+            parser = argparse.ArgumentParser(
+            description="Ipset delta generator and applier"
+            )
+
+            parser.add_argument(
+                "-m",
+                dest="mode",
+                choices=["make", "apply"],
+                required=True,
+                help="Mode: make = write delta between -old and -new, apply = patch -f with delta -d"
+            )
+
+            parser.add_argument(
+                "-old",
+                dest="old",
+                default=None,
+                help="Previous ipset version (make mode)"
+            )
+
+            parser.add_argument(
+                "-new",
+                dest="new",
+                default=None,
+                help="New ipset version (make mode)"
+            )
+
+            parser.add_argument(
+                "-d",
+                dest="delta",
+                default=None,
+                help="Delta file to write (make mode, optional) or to apply (apply mode)"
+            )
+
+            parser.add_argument(
+                "-f",
+                dest="filename",
+                default="ipset-all.txt",
+                help="Local ipset to patch (default: ipset-all.txt)"
+            )
+
+            parser.add_argument(
+                "-u",
+                "--url",
+                default=IPSET_ALL_URL,
+                help="Full list URL used when the delta does not apply"
+            )
+
+            parser.add_argument(
+                "--no-fetch",
+                dest="no_fetch",
+                action="store_true",
+                help="Do not fall back to a full download"
+            )
+
+        elif self.service_name == "profile":
+            parser = argparse.ArgumentParser(
+            description="Profile compiler: merges list files per winws filter section"
+            )
+
+            parser.add_argument(
+                "profiles",
+                nargs="+",
+                help="Profile .bat file(s), e.g. 'general.bat'"
+            )
+
+            parser.add_argument(
+                "-o",
+                "--output",
+                default="compiled",
+                help="Output directory (default: compiled)"
+            )
+
+            parser.add_argument(
+                "-gf",
+                "--game-filter",
+                dest="game_filter",
+                default="0",
+                help="Value of %%GameFilter%%: '0' = disabled, '1024-65535' = enabled (default: 0)"
+            )
+
+            parser.add_argument(
+                "-hs",
+                "--hide-switch",
+                dest="hide_switch",
+                choices=["default", "hide"],
+                default="default",
+                help="Value of %%HideSwitchStatus%% (default: default)"
+            )
+
+            parser.add_argument(
+                "-r",
+                "--report-only",
+                dest="report_only",
+                action="store_true",
+                help="Only print per-section entry counts, write nothing"
+            )
+
+            parser.add_argument(
+                "--diff",
+                action="store_true",
+                help="Compare effective coverage of two profiles"
+            )
+
+        elif self.service_name == "blockcheck":
+            parser = argparse.ArgumentParser(
+            description="Blockcheck log analyzer and strategy ranker"
+            )
+
+            parser.add_argument(
+                "logs",
+                nargs="+",
+                help="blockcheck.log file(s) or glob patterns, .gz is supported"
+            )
+
+            parser.add_argument(
+                "-n",
+                "--top",
+                default=5,
+                type=int,
+                help="Strategies to show per protocol (default: 5)"
+            )
+
+            parser.add_argument(
+                "-p",
+                "--profiles",
+                default=None,
+                help="Directory with profile .bat files to map strategies to (default: repository root)"
+            )
+
+        elif self.service_name == "rdns":
+            from rdns import HOSTS_PER_PREFIX
+
+            parser = argparse.ArgumentParser(
+            description="Bulk reverse-DNS attribution of ipset addresses"
+            )
+
+            parser.add_argument(
+                "-f",
+                dest="filename",
+                required=True,
+                help="ips-* or ipset file with the addresses to look up"
+            )
+
+            parser.add_argument(
+                "-pp",
+                "--per-prefix",
+                dest="per_prefix",
+                default=HOSTS_PER_PREFIX,
+                type=int,
+                help=f"Host addresses to look up from every prefix wider than one address, 0 to skip those prefixes (default: {HOSTS_PER_PREFIX})"
+            )
+
+            parser.add_argument(
+                "-o",
+                "--output",
+                default=None,
+                help="'host : ip' output file (default: hosts-<input name> next to the input)"
+            )
+
+            parser.add_argument(
+                "-ns",
+                "--nameserver",
+                default=None,
+                help="DNS server as host or host:port (default: first nameserver in /etc/resolv.conf, else 1.1.1.1)"
+            )
+
+            parser.add_argument(
+                "-w",
+                "--workers",
+                default=200,
+                type=int,
+                help="Max queries in flight (default: 200)"
+            )
+
+            parser.add_argument(
+                "-t",
+                "--timeout",
+                default=2.0,
+                type=float,
+                help="Seconds to wait for an answer before resending (default: 2)"
+            )
+
+            parser.add_argument(
+                "-r",
+                "--retries",
+                default=2,
+                type=int,
+                help="Resends per address after the first query (default: 2)"
+            )
+
+            parser.add_argument(
+                '-ch',
+                '--cache',
+                action='store_true',
+                help="Enable the PTR cache"
+            )
+
+            parser.add_argument(
+                "-a",
+                "--hostlist",
+                default=None,
+                help="Hostlist to add the found hostnames to"
+            )
+
+            parser.add_argument(
+                '-om',
+                dest='only_main',
+                action='store_true',
+                help='Reduce found hostnames to their main domain before adding them to the hostlist'
+            )
+
+        elif self.service_name == "lint":
+            parser = argparse.ArgumentParser(
+            description="Validator for list-*, hostlist-* and ipset-* files"
+            )
+
+            parser.add_argument(
+                "paths",
+                nargs="*",
+                default=[os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)],
+                help="List files, globs or directories to check (default: lists/)"
+            )
+
+            parser.add_argument(
+                "--fix",
+                action="store_true",
+                help="Rewrite files with problems fixed; entries that cannot be fixed are dropped, errors still exit non-zero"
+            )
+
+            parser.add_argument(
+                "-s",
+                "--strict",
+                action="store_true",
+                help="Exit non-zero on warnings too (unless --fix fixed them)"
+            )
+
+        elif self.service_name == "windivert":
+            parser = argparse.ArgumentParser(
+            description="WinDivert filter generator for ipsets"
+            )
+
+            parser.add_argument(
+                "-f",
+                dest="filename",
+                default="ipset-voice-discord.txt",
+                help="Ipset to compile (default: ipset-voice-discord.txt)"
+            )
+
+            parser.add_argument(
+                "-b",
+                "--base",
+                default=None,
+                help="Base filter with the port / payload tests, a path or a file name in lists/windiwert.filter/"
+            )
+
+            parser.add_argument(
+                "-n",
+                "--budget",
+                default=None,
+                type=int,
+                help="Max number of address ranges; the closest ranges are merged to fit (default: fit WinDivert's limit)"
+            )
+
+            parser.add_argument(
+                "--widen",
+                action="store_true",
+                help="Accept a merge that makes the filter match more than 10%% extra addresses"
+            )
+
+            parser.add_argument(
+                "--split",
+                action="store_true",
+                help="Write several exact filters (-o name-1.ext, name-2.ext, ...) instead of widening one"
+            )
+
+            parser.add_argument(
+                "-src",
+                "--source",
+                action="store_true",
+                help="Match the source address instead of the destination (inbound traffic)"
+            )
+
+            parser.add_argument(
+                "-s",
+                "--samples",
+                default=10000,
+                type=int,
+                help="Sample addresses per IP version to verify the filter with (default: 10000)"
+            )
+
+            parser.add_argument(
+                "-o",
+                "--output",
+                default=None,
+                help="File to write the filter to, e.g. for winws --wf-raw=@file (default: print it)"
+            )
+
         else:
             raise ValueError(f"Service '{self.service_name}' is not recognized.")
         
         return parser
     
    
-    def find_file(self, filename: str, max_depth: int = 3) -> str:
+    @staticmethod
+    def setup_logging(level: int = logging.INFO) -> None:
+        logging.basicConfig(level=level, format='[%(levelname)s] %(message)s')
+
+
+    @staticmethod
+    def find_file(filename: str, max_depth: int = 3) -> str:
         current_dir = os.path.abspath(os.curdir)
         for _ in range(max_depth):
             candidate = os.path.join(current_dir, filename)
@@ -150,7 +690,32 @@ class Service:
         raise FileNotFoundError(f"File '{filename}' not found within {max_depth} directory levels upward.")
 
 
-    def log_file_change(self, func) -> Callable:
+    @staticmethod
+    def write_atomic(file_path: str, lines: Iterable[str], newline: str = "\n") -> None:
+        """
+        Writes lines to a temp file next to the target and moves it into place,
+        so readers (winws, other scripts) never see a half-written list.
+        """
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+                for line in lines:
+                    f.write(line + newline)
+            if os.path.exists(file_path):
+                os.chmod(tmp_path, os.stat(file_path).st_mode)
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+    @staticmethod
+    def log_file_change(func) -> Callable:
         @wraps(func)
         def wrapper(file_path: str, *args, **kwargs) -> None:
             before = []
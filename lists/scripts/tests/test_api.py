@@ -0,0 +1,31 @@
+import subprocess, sys, os
+
+import api
+from prefixset import PrefixSet
+
+
+def test_dedup_keeps_first_occurrence_order():
+    assert api.dedup(["b.com", " a.com ", "", "b.com", "a.com\n", "c.com"]) == ["b.com", "a.com", "c.com"]
+
+
+def test_aggregate_collapses_like_ipaddress():
+    entries = [
+        "10.0.1.0/24", "10.0.0.0/24", "10.0.0.5", "192.0.2.7/24", "",
+        "2001:db8::/33", "2001:db8:8000::/33", "2001:db8::1", "1.1.1.1",
+    ]
+    assert api.aggregate(entries) == ["1.1.1.1/32", "10.0.0.0/23", "192.0.2.0/24", "2001:db8::/32"]
+
+
+def test_collapse_splits_unaligned_ranges():
+    # 10.0.0.1-10.0.0.6 is not one prefix
+    hosts = [f"10.0.0.{i}" for i in range(1, 7)]
+    assert list(PrefixSet(hosts).collapse().lines()) == ["10.0.0.1/32", "10.0.0.2/31", "10.0.0.4/31", "10.0.0.6/32"]
+
+
+def test_import_has_no_side_effects():
+    code = (
+        "import sys, logging, api\n"
+        "assert not logging.getLogger().handlers\n"
+        "assert not {'aiohttp', 'tldextract', 'prefixset'} & set(sys.modules)\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(api.__file__), check=True)
@@ -0,0 +1,59 @@
+import gzip
+
+from blockcheck_analyzer import analyze, rank, Stats
+
+
+def run(domain, strategy, ok, protocol="curl_test_https_tls12"):
+    return [
+        f"- {protocol} ipv4 {domain} : winws --wf-l3=ipv4 --wf-tcp=443 {strategy}",
+        "- checking tls 1.2 ...",
+        "!!!!! AVAILABLE !!!!!" if ok else "UNAVAILABLE code=28",
+        "",
+    ]
+
+
+def write_log(path, lines):
+    text = "\n".join(lines) + "\n"
+    if str(path).endswith(".gz"):
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        path.write_text(text, encoding="utf-8")
+
+
+def test_wilson_score_prefers_tested_strategies():
+    lucky, steady = Stats(), Stats()
+    lucky.success, lucky.total = 1, 1
+    steady.success, steady.total = 9, 10
+
+    assert lucky.rate() > steady.rate()
+    assert 0 < lucky.score() < steady.score() < steady.rate()
+    assert Stats().score() == 0.0
+
+
+def test_rank_sample_log(tmp_path):
+    lucky, steady, wide = "--dpi-desync=fake", "--dpi-desync=split2", "--dpi-desync=fake,multidisorder"
+    lines = run("rutracker.org", lucky, True)
+    for attempt in range(10):
+        lines += run("rutracker.org", steady, attempt != 3)
+    lines += run("rutracker.org", wide, True) + run("youtube.com", wide, True) + run("youtube.com", wide, False)
+    lines += run("rutracker.org", "--dpi-desync=disorder2", False)
+    lines += run("youtube.com", "--dpi-desync=fake", True, protocol="curl_test_http3")
+
+    summary = [
+        "* SUMMARY",
+        f"curl_test_https_tls12 ipv4 rutracker.org : winws --wf-l3=ipv4 --wf-tcp=443 {steady}",
+        "curl_test_https_tls12 ipv4 youtube.com : winws not working",
+    ]
+    write_log(tmp_path / "blockcheck.log", lines[:len(lines) // 2])
+    write_log(tmp_path / "blockcheck2.log.gz", lines[len(lines) // 2:] + summary)
+
+    stats = analyze([str(tmp_path / "blockcheck.log"), str(tmp_path / "blockcheck2.log.gz")])
+
+    assert (stats[("tls12", steady)].success, stats[("tls12", steady)].total) == (9, 10)
+    assert stats[("tls12", steady)].summary_hits == 1
+    assert stats[("tls12", wide)].domains_ok == {"rutracker.org", "youtube.com"}
+
+    ranking = rank(stats)
+    assert [strategy for strategy, _ in ranking["tls12"]] == [wide, steady, lucky]
+    assert [strategy for strategy, _ in ranking["quic"]] == [lucky]
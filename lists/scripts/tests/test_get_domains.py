@@ -0,0 +1,66 @@
+import time, shutil
+
+import pytest
+
+from get_domains import wait_network_quiet, track_resources, crawl_host
+
+
+class FakeDriver:
+    """
+    Answers RESOURCES_COUNT_JS with a scripted sequence of (count, buffer_full).
+    """
+    def __init__(self, counts):
+        self.counts = list(counts)
+
+    def execute_script(self, script):
+        return self.counts.pop(0) if len(self.counts) > 1 else self.counts[0]
+
+
+def test_quiet_after_count_stops_growing():
+    driver = FakeDriver([(1, False), (5, False), (9, False)])
+    started = time.monotonic()
+    wait_network_quiet(driver, quiet=0.2, timeout=5, poll=0.05)
+    assert time.monotonic() - started < 1
+
+
+def test_full_buffer_is_not_quiet():
+    driver = FakeDriver([(250, True)])
+    started = time.monotonic()
+    wait_network_quiet(driver, quiet=0.2, timeout=1, poll=0.05)
+    assert time.monotonic() - started >= 1
+
+
+def chrome_driver():
+    pytest.importorskip("selenium")
+    if not any(shutil.which(name) for name in ("chromedriver", "chromium", "chromium-browser", "google-chrome")):
+        pytest.skip("no Chrome / chromedriver available")
+
+    from selenium import webdriver
+    options = webdriver.ChromeOptions()
+    for arg in ("--headless=new", "--no-sandbox", "--disable-gpu"):
+        options.add_argument(arg)
+    return webdriver.Chrome(options=options)
+
+
+def test_crawl_host_waits_for_delayed_resources(http_server):
+    root, base = http_server
+    # 300 images overflow the default 250-entry timing buffer, the delayed one
+    # comes from another host ('localhost') after the page has finished loading
+    images = "".join(f'<img src="/img{i}.gif">' for i in range(300))
+    delayed = base.replace("127.0.0.1", "localhost")
+    (root / "index.html").write_text(
+        f"<html><body>{images}<script>"
+        f"setTimeout(() => {{ new Image().src = '{delayed}/late.gif'; }}, 1500);"
+        f"</script></body></html>"
+    )
+
+    driver = chrome_driver()
+    try:
+        track_resources(driver)
+        domains = crawl_host(driver, f"{base}/index.html", quiet=3, timeout=20)
+        count = driver.execute_script("return window.__resourceCount;")
+    finally:
+        driver.quit()
+
+    assert count >= 301
+    assert set(domains) == {"127.0.0.1", "localhost"}
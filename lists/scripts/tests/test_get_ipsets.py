@@ -0,0 +1,45 @@
+import asyncio, json
+
+import get_ipsets
+from get_ipsets import remove_duplicates, save_entries
+
+
+def test_remove_duplicates_keeps_comments_and_invalid_lines(tmp_path):
+    path = tmp_path / "ipset-test.txt"
+    path.write_text("# my comment\n1.2.3.4/24\n5.6.7.8\n5.6.7.8/32\nbogus\n")
+
+    remove_duplicates(str(path))
+
+    assert path.read_text().splitlines() == ["# my comment", "1.2.3.4/24", "bogus", "5.6.7.8"]
+
+
+def test_save_entries_keeps_comments(tmp_path):
+    path = tmp_path / "ipset-test.txt"
+    path.write_text("# header\n10.0.0.0/8\n")
+
+    added = save_entries(["10.1.2.3/32", "192.0.2.0/24"], str(path), skip_covered=True)
+
+    assert added == 1
+    assert path.read_text().splitlines() == ["# header", "10.0.0.0/8", "192.0.2.0/24"]
+
+
+def test_cidr_journal_keeps_only_failed_lookups_for_resume(tmp_path, monkeypatch):
+    journal = tmp_path / "cidr_journal.jsonl"
+    answers = {"192.0.2.1": ["192.0.2.0/24"], "198.51.100.1": [], "203.0.113.1": None}
+
+    async def fake_fetch(ip, session, cache=None):
+        # None = temporary failure (not cached), [] = permanent empty answer like HTTP 404
+        if answers[ip] is None:
+            return []
+        cache[f"cidr:{ip}"] = answers[ip]
+        return answers[ip]
+    monkeypatch.setattr(get_ipsets, "fetch_cidrs", fake_fetch)
+
+    cidrs = asyncio.run(get_ipsets.get_cidrs(list(answers), False, journal_path=str(journal)))
+    assert cidrs == {"192.0.2.0/24"}
+    assert sorted(json.loads(line)["ip"] for line in journal.read_text().splitlines()) == ["192.0.2.1", "198.51.100.1"]
+
+    answers["203.0.113.1"] = ["203.0.113.0/24"]
+    cidrs = asyncio.run(get_ipsets.get_cidrs(list(answers), False, resume=True, journal_path=str(journal)))
+    assert cidrs == {"192.0.2.0/24", "203.0.113.0/24"}
+    assert not journal.exists()
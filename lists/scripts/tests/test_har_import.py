@@ -0,0 +1,53 @@
+import json
+
+from har_import import iter_hosts, import_hosts, to_hostname
+
+
+HAR = {"log": {"entries": [
+    {"request": {"url": "https://Discord.com./api/v9"}, "response": {"redirectURL": "https://cdn.discordapp.com/x"}},
+    {"request": {"url": "https://1.2.3.4/ip-literal"}, "response": {"redirectURL": ""}},
+    {"request": {"url": "wss://gateway.discord.gg/?v=9"}, "response": {"redirectURL": ""}},
+]}}
+
+NETLOG = {"constants": {}, "events": [
+    {"params": {"url": "https://www.youtube.com/"}},
+    {"params": {"host": "rr1---sn-abc.googlevideo.com:443"}},
+    {"params": {"origin": "https://i.ytimg.com"}},
+    {"params": {"host": "localhost:80"}},
+    {"params": {"url": "https://after-the-cut.example/"}},
+]}
+
+
+def test_to_hostname():
+    assert to_hostname("rr1---sn-abc.googlevideo.com:443") == "rr1---sn-abc.googlevideo.com"
+    assert to_hostname("https://[2001:db8::1]/") is None
+    assert to_hostname("http://[oops/") is None
+    assert to_hostname("localhost") is None
+
+
+def test_iter_hosts_har(tmp_path):
+    path = tmp_path / "session.har"
+    path.write_text(json.dumps(HAR), encoding="utf-8")
+
+    assert list(iter_hosts(str(path))) == ["discord.com", "cdn.discordapp.com", "gateway.discord.gg"]
+
+
+def test_iter_hosts_truncated_netlog(tmp_path, caplog):
+    text = json.dumps(NETLOG)
+    path = tmp_path / "netlog.json"
+    # Chrome killed mid-write: the file ends inside the last event
+    path.write_text(text[:text.index("after-the-cut")], encoding="utf-8")
+
+    assert list(iter_hosts(str(path))) == ["www.youtube.com", "rr1---sn-abc.googlevideo.com", "i.ytimg.com"]
+    assert "truncated" in caplog.text
+
+
+def test_import_hosts_skips_unreadable(tmp_path):
+    good = tmp_path / "good.har"
+    good.write_text(json.dumps(HAR), encoding="utf-8")
+    broken = tmp_path / "broken.har"
+    broken.write_text('{"log": {"entries": [}', encoding="utf-8")
+
+    hosts = import_hosts([str(good), str(broken), str(tmp_path / "missing.har")])
+
+    assert hosts == ["cdn.discordapp.com", "discord.com", "gateway.discord.gg"]
@@ -0,0 +1,49 @@
+import asyncio
+
+from http_crawler import crawl, extract_links, PAGE
+
+
+def test_extract_links_skips_malformed_urls():
+    html = '<a href="http://[oops/x">bad</a><a href="/b.html">good</a><img src="https://cdn.example.net/i.png">'
+    found, follow = extract_links(PAGE, "http://127.0.0.1/a.html", html)
+
+    assert "https://cdn.example.net/i.png" in found
+    assert follow == [(PAGE, "http://127.0.0.1/b.html")]
+
+
+def test_crawl_survives_malformed_links(http_server):
+    root, base = http_server
+    (root / "index.html").write_text(
+        '<a href="bad.html">bad</a><a href="good.html">good</a>'
+    )
+    (root / "bad.html").write_text(
+        '<a href="http://[oops/x">broken</a><img src="https://img.bad-page.example/x.png">'
+    )
+    (root / "good.html").write_text(
+        '<script src="app.js"></script>'
+        '<link rel="stylesheet" href="https://third-party.example/style.css">'
+    )
+    (root / "app.js").write_text('fetch("https://api.from-script.example/v1");')
+
+    domains = asyncio.run(asyncio.wait_for(crawl([f"{base}/index.html"], depth=3, concurrency=1, timeout=5), 20))
+
+    assert "img.bad-page.example" in domains
+    assert "api.from-script.example" in domains
+    assert "third-party.example" in domains
+
+
+def test_crawl_follows_same_site_only(http_server):
+    root, base = http_server
+    # 'localhost' is a different site from '127.0.0.1', so its script is listed but not fetched
+    third_party = base.replace("127.0.0.1", "localhost")
+    (root / "index.html").write_text(
+        f'<script src="{third_party}/other.js"></script><script src="local.js"></script>'
+    )
+    (root / "local.js").write_text('"//assets.local-script.example/a.png"')
+    (root / "other.js").write_text('"//assets.other-script.example/a.png"')
+
+    domains = asyncio.run(asyncio.wait_for(crawl([f"{base}/index.html"], depth=2, concurrency=2, timeout=5), 20))
+
+    assert "localhost" in domains
+    assert "assets.local-script.example" in domains
+    assert "assets.other-script.example" not in domains
@@ -0,0 +1,72 @@
+import sys
+
+import pytest
+
+import ipset_delta
+from ipset_delta import make_delta, apply_delta, iter_sorted, content_hash
+
+
+OLD = ["203.0.113.0/24", "192.0.2.0/24", "2001:db8::/32", "198.51.100.0/24"]
+NEW = ["192.0.2.0/24", "198.51.100.0/24", "198.51.100.77", "2001:db8::/32", "2001:db9::/48"]
+
+
+def write(path, entries):
+    path.write_text("".join(f"{entry}\n" for entry in entries))
+    return str(path)
+
+
+def test_make_apply_roundtrip(tmp_path):
+    old = write(tmp_path / "old.txt", OLD)
+    new = write(tmp_path / "new.txt", NEW)
+    local = write(tmp_path / "ipset-all.txt", OLD)
+
+    delta = make_delta(old, new, str(tmp_path / "update.delta"))
+
+    assert apply_delta(delta, local, url=None)
+    assert content_hash(local) == content_hash(new)
+    assert apply_delta(delta, local, url=None)
+
+
+def test_external_sort_matches_in_memory_sort(tmp_path, monkeypatch):
+    entries = [f"10.{i % 251}.{i % 13}.0/24" for i in range(2000)] + ["2001:db8::/32", "1.2.3.4"]
+    path = write(tmp_path / "unsorted.txt", entries)
+
+    expected = list(iter_sorted(path))
+    monkeypatch.setattr(ipset_delta, "SORT_CHUNK", 100)
+    assert list(iter_sorted(path)) == expected
+    assert [key for key, _ in expected] == sorted(key for key, _ in expected)
+
+
+def test_hash_mismatch_falls_back_to_full_download(tmp_path, http_server):
+    root, base = http_server
+    old = write(tmp_path / "old.txt", OLD)
+    new = write(tmp_path / "new.txt", NEW)
+    write(root / "ipset-all.txt", NEW)
+    (tmp_path / "local").mkdir()
+    local = write(tmp_path / "local" / "ipset-all.txt", ["192.0.2.0/24"])
+
+    delta = make_delta(old, new, str(tmp_path / "update.delta"))
+
+    assert not apply_delta(delta, local, url=None)
+    assert open(local).read() == "192.0.2.0/24\n"
+    assert apply_delta(delta, local, url=f"{base}/ipset-all.txt")
+    assert content_hash(local) == content_hash(new)
+
+
+def test_missing_local_file_is_downloaded(tmp_path, http_server, monkeypatch):
+    root, base = http_server
+    delta = make_delta(write(tmp_path / "old.txt", OLD), write(tmp_path / "new.txt", NEW), str(tmp_path / "u.delta"))
+    write(root / "ipset-all.txt", NEW)
+    work = tmp_path / "work"
+    work.mkdir()
+    monkeypatch.chdir(work)
+
+    monkeypatch.setattr(sys, "argv", ["ipset_delta.py", "-m", "apply", "-d", delta, "-f", "ipset-missing.txt",
+                                      "-u", f"{base}/ipset-all.txt"])
+    ipset_delta.main()
+
+    assert content_hash(str(work / "ipset-missing.txt")) == content_hash(str(tmp_path / "new.txt"))
+
+    monkeypatch.setattr(sys, "argv", ["ipset_delta.py", "-m", "apply", "-d", delta, "-f", "ipset-other.txt", "--no-fetch"])
+    with pytest.raises(SystemExit):
+        ipset_delta.main()
@@ -0,0 +1,44 @@
+import sys
+
+import lint_lists
+from lint_lists import lint_file
+
+
+def run_main(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["lint_lists.py", *args])
+    monkeypatch.setattr(lint_lists.Service, "setup_logging", staticmethod(lambda *a, **k: None))
+    try:
+        lint_lists.main()
+    except SystemExit as e:
+        return e.code
+    return 0
+
+
+def test_fix_drops_covered_and_duplicate_prefixes(tmp_path, monkeypatch):
+    path = tmp_path / "ipset-test.txt"
+    path.write_bytes(b"# test\r\n10.0.0.0/8\r\n10.1.2.0/24\r\n192.0.2.1\r\n192.0.2.1/32\r\n192.0.2.1\r\n")
+
+    assert run_main(monkeypatch, str(path), "--strict") == 1
+    assert run_main(monkeypatch, str(path), "--fix", "--strict") == 0
+
+    assert path.read_bytes() == b"# test\r\n10.0.0.0/8\r\n192.0.2.1\r\n"
+    assert lint_file(str(path)) == []
+    assert run_main(monkeypatch, str(path), "--strict") == 0
+
+
+def test_fix_still_fails_on_errors(tmp_path, monkeypatch):
+    path = tmp_path / "ipset-ipv4-test.txt"
+    path.write_text("10.0.0.0/8\n10.0.0.0/8\n2001:db8::/32\n192.0.2.1/24\nnot-an-ip\n", encoding="utf-8")
+
+    assert run_main(monkeypatch, str(path), "--fix") == 1
+    assert path.read_text(encoding="utf-8") == "10.0.0.0/8\n192.0.2.0/24\n"
+    assert run_main(monkeypatch, str(path)) == 0
+
+
+def test_fix_hostlist(tmp_path, monkeypatch):
+    path = tmp_path / "list-test.txt"
+    path.write_text("discord.com\nDiscord.com.\ncdn.discord.com\nhttps://youtube.com/watch\n", encoding="utf-8")
+
+    # the URL is an error: it is rewritten to its hostname, but still worth a look
+    assert run_main(monkeypatch, str(path), "--fix") == 1
+    assert path.read_text(encoding="utf-8").splitlines() == ["discord.com", "youtube.com"]
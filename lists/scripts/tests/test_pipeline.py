@@ -0,0 +1,35 @@
+import asyncio, json
+
+import pipeline
+from pipeline import run_pipeline
+
+
+def test_parent_domain_replaces_accepted_subdomains(tmp_path, monkeypatch):
+    har = tmp_path / "session.har"
+    entries = [{"request": {"url": f"https://{host}/"}} for host in
+               ("a.example.com", "a.example.com", "b.example.com", "example.com", "other.example")]
+    har.write_text(json.dumps({"log": {"entries": entries}}))
+    hostlist = tmp_path / "hostlist-test.txt"
+
+    async def no_ips(self, domain, refresh=False):
+        return [], []
+    monkeypatch.setattr(pipeline.Resolver, "resolve", no_ips)
+
+    asyncio.run(run_pipeline(str(hostlist), [], [str(har)], "1", "ips"))
+
+    assert hostlist.read_text().splitlines() == ["example.com", "other.example"]
+
+
+def test_unreadable_har_does_not_stop_the_pipeline(tmp_path, monkeypatch):
+    har = tmp_path / "session.har"
+    har.write_text(json.dumps({"log": {"entries": [{"request": {"url": "https://example.org/"}}]}}))
+    hostlist = tmp_path / "hostlist-test.txt"
+
+    async def no_ips(self, domain, refresh=False):
+        return [], []
+    monkeypatch.setattr(pipeline.Resolver, "resolve", no_ips)
+
+    missing = str(tmp_path / "missing.har")
+    asyncio.run(run_pipeline(str(hostlist), [], [missing, str(har)], "1", "ips"))
+
+    assert hostlist.read_text().splitlines() == ["example.org"]
@@ -0,0 +1,38 @@
+import json
+
+from port_sampler import PortSampler, parse_ports, replay_snapshots, sample, merge_into_ipset
+
+
+def write_recording(path, snapshots):
+    with open(path, "w", encoding="utf-8") as f:
+        for number, connections in enumerate(snapshots):
+            f.write(json.dumps({"time": number, "connections": connections}) + "\n")
+        f.write("not json\n")
+
+
+def test_replay_merges_while_sampling(tmp_path):
+    recording = tmp_path / "record.jsonl"
+    write_recording(recording, [
+        [["udp", "162.159.130.5", 50001, "NONE"], ["tcp", "198.51.100.9", 443, "ESTABLISHED"]],
+        [["udp", "162.159.130.5", 50001, "NONE"], ["udp", "162.159.130.6", 50002, "NONE"]],
+        [["tcp", "10.0.0.1", 50003, "ESTABLISHED"], ["tcp", "::ffff:162.159.130.7", 2099, "SYN_SENT"]],
+        [["udp", "2001:4860::8", 50100, "NONE"], ["tcp", "162.159.130.8", 2099, "TIME_WAIT"]],
+    ])
+    ipset = tmp_path / "ipset-ports.txt"
+    ipset.write_text("# ports\n162.159.0.0/16\n", encoding="utf-8")
+
+    sampler = PortSampler(parse_ports("50000-50100,2099"))
+    merged = []
+
+    def merge():
+        prefixes = sampler.prefixes(24, 48)
+        merged.append(merge_into_ipset(prefixes, str(ipset)))
+
+    sample(replay_snapshots(str(recording)), sampler, merge=merge, merge_every=2)
+
+    assert [str(ip) for ip in sampler.ips] == ["162.159.130.5", "162.159.130.6", "162.159.130.7", "2001:4860::8"]
+    assert sampler.polls == 4
+    assert sampler.prefixes() == ["162.159.130.5/32", "162.159.130.6/31", "2001:4860::8/128"]
+    # one merge after two new endpoints, another for the rest at the end
+    assert merged == [0, 1]
+    assert ipset.read_text(encoding="utf-8").splitlines() == ["# ports", "162.159.0.0/16", "2001:4860::/48"]
@@ -0,0 +1,60 @@
+import logging
+
+from profile_compiler import parse_profile, effective_lists, diff_profiles, merge_ipsets
+
+
+PROFILE = """@echo off
+set "BIN=%~dp0bin\\%HideSwitchStatus%\\"
+set "LISTS=%~dp0lists\\"
+
+start "zapret: %~n0" /min "%BIN%winws.exe" --wf-tcp=80,443,%GameFilter% ^
+--filter-tcp=443 --hostlist="%LISTS%{hosts}" --dpi-desync=fake --new ^
+--filter-udp=443 --ipset="%LISTS%{ipset}" --dpi-desync-fake-quic="%BIN%quic.bin"
+"""
+
+
+def write_profile(root, name, hosts, ipset):
+    path = root / name
+    path.write_text(PROFILE.format(hosts=hosts, ipset=ipset).replace("\n", "\r\n"), encoding="utf-8")
+    return path
+
+
+def test_parse_profile_expands_variables(tmp_path):
+    profile = parse_profile(str(write_profile(tmp_path, "a.bat", "hosts-a.txt", "ipset-a.txt")), game_filter="12")
+
+    assert profile.global_args == [("--wf-tcp", "80,443,12")]
+    assert profile.sections[0].lists["--hostlist"] == [str(tmp_path / "lists" / "hosts-a.txt")]
+    assert profile.sections[1].signature() == "udp=443"
+    assert ("--dpi-desync-fake-quic", str(tmp_path / "bin" / "default" / "quic.bin")) in profile.sections[1].args
+
+
+def test_merge_ipsets_collapses(tmp_path):
+    (tmp_path / "one.txt").write_text("10.0.0.0/24\n# comment\nbogus\n", encoding="utf-8")
+    (tmp_path / "two.txt").write_text("10.0.1.0/24\n10.0.0.7\n2001:db8::/32\n", encoding="utf-8")
+
+    assert merge_ipsets([str(tmp_path / "one.txt"), str(tmp_path / "two.txt")]) == (4, ["10.0.0.0/23", "2001:db8::/32"])
+
+
+def test_diff_profiles_reports_coverage_changes(tmp_path, caplog):
+    lists = tmp_path / "lists"
+    lists.mkdir()
+    (lists / "hosts-a.txt").write_text("discord.com\nwww.discord.com\nyoutube.com\n", encoding="utf-8")
+    (lists / "hosts-b.txt").write_text("discord.com\ngooglevideo.com\n", encoding="utf-8")
+    (lists / "ipset-a.txt").write_text("10.0.0.0/24\n10.0.1.0/24\n", encoding="utf-8")
+    (lists / "ipset-b.txt").write_text("10.0.0.0/23\n", encoding="utf-8")
+
+    first = parse_profile(str(write_profile(tmp_path, "a.bat", "hosts-a.txt", "ipset-a.txt")))
+    second = parse_profile(str(write_profile(tmp_path, "b.bat", "hosts-b.txt", "ipset-b.txt")))
+
+    assert effective_lists(first)[0]["--hostlist"] == (3, ["discord.com", "youtube.com"])
+    assert effective_lists(first)[1]["--ipset"][1] == effective_lists(second)[1]["--ipset"][1] == ["10.0.0.0/23"]
+
+    with caplog.at_level(logging.DEBUG):
+        diff_profiles(first, second)
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert "  tcp=443 hostlist: +1 -1" in messages
+    assert "    + googlevideo.com" in messages
+    assert "    - youtube.com" in messages
+    # same addresses written differently are not a change
+    assert not any("ipset" in message for message in messages)
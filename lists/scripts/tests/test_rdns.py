@@ -0,0 +1,85 @@
+import asyncio, struct
+
+from rdns import ReverseResolver, attribute, read_ips, build_query, parse_response, read_name, HEADER, TYPE_PTR, CLASS_IN
+
+
+def encode_name(name):
+    return b"".join(bytes([len(label)]) + label.encode() for label in name.split(".")) + b"\0"
+
+
+class StubDns(asyncio.DatagramProtocol):
+    """
+    Answers PTR queries from a table; addresses not in it get NXDOMAIN.
+    The first query for every name in drop_once is ignored, to exercise retries.
+    """
+    def __init__(self, table, drop_once=()):
+        self.table = table
+        self.drop_once = set(drop_once)
+        self.queries = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.queries += 1
+        qid = HEADER.unpack_from(data)[0]
+        name, end = read_name(data, HEADER.size)
+        question = data[HEADER.size:end + 4]
+        if name in self.drop_once:
+            self.drop_once.discard(name)
+            return
+
+        target = self.table.get(name)
+        if target is None:
+            self.transport.sendto(HEADER.pack(qid, 0x8183, 1, 0, 0, 0) + question, addr)
+            return
+        rdata = encode_name(target)
+        answer = b"\xc0\x0c" + struct.pack("!HHIH", TYPE_PTR, CLASS_IN, 300, len(rdata)) + rdata
+        self.transport.sendto(HEADER.pack(qid, 0x8180, 1, 1, 0, 0) + question + answer, addr)
+
+
+def test_parse_response_roundtrip():
+    query = build_query(0x1234, "1.2.0.192.in-addr.arpa")
+    answer = b"\xc0\x0c" + struct.pack("!HHIH", TYPE_PTR, CLASS_IN, 60, 13) + encode_name("host.example")
+    data = HEADER.pack(0x1234, 0x8180, 1, 1, 0, 0) + query[HEADER.size:] + answer
+
+    assert parse_response(data) == (0x1234, 0, "1.2.0.192.in-addr.arpa", ["host.example"])
+
+
+def test_attribute_against_stub_server():
+    table = {f"{i}.2.0.192.in-addr.arpa": f"host{i}.example" for i in range(1, 200)}
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        transport, stub = await loop.create_datagram_endpoint(
+            lambda: StubDns(table, drop_once={"5.2.0.192.in-addr.arpa"}), local_addr=("127.0.0.1", 0)
+        )
+        port = transport.get_extra_info("sockname")[1]
+        try:
+            ips = [f"192.0.2.{i}" for i in range(1, 200)] + ["198.51.100.1"]
+            resolver = ReverseResolver(f"127.0.0.1:{port}", concurrency=50, timeout=0.5, retries=2)
+            result = await attribute(ips, resolver)
+
+            queries = stub.queries
+            cached = await attribute(ips, resolver)
+            return result, cached, queries, stub.queries
+        finally:
+            transport.close()
+
+    result, cached, queries, queries_after = asyncio.run(run())
+
+    assert result["192.0.2.5"] == "host5.example"
+    assert result["192.0.2.199"] == "host199.example"
+    assert result["198.51.100.1"] == ""
+    assert cached == result
+    assert queries_after == queries
+
+
+def test_read_ips_samples_wider_prefixes(tmp_path):
+    path = tmp_path / "ipset-test.txt"
+    path.write_text("# test\n192.0.2.7\n198.51.100.0/24\n2001:db8::/64\n192.0.2.7/32\nbogus\n10.0.0.0/31\n", encoding="utf-8")
+
+    assert read_ips(str(path), per_prefix=2) == [
+        "192.0.2.7", "198.51.100.1", "198.51.100.2", "2001:db8::1", "2001:db8::2", "10.0.0.0", "10.0.0.1",
+    ]
+    assert read_ips(str(path), per_prefix=0) == ["192.0.2.7"]
@@ -0,0 +1,89 @@
+import asyncio, socket
+
+from resolver import Resolver
+from watcher import IpsetWatcher
+
+
+def make_lookup(answers, calls=None):
+    """
+    Fake Resolver._lookup: answers maps domain -> IPv4 list, or None for a temporary failure.
+    """
+    async def lookup(domain, family):
+        if family != socket.AF_INET:
+            return []
+        if calls is not None:
+            calls.append(domain)
+        return answers[domain]
+    return lookup
+
+
+def make_watcher(tmp_path, answers, calls=None):
+    watcher = IpsetWatcher(str(tmp_path), "1", "ips", state_path=str(tmp_path / "watch_state.json"))
+    watcher.resolver._lookup = make_lookup(answers, calls)
+    return watcher
+
+
+def test_resolver_caches_empty_answers_and_retries_failures():
+    answers = {"flaky.example": None, "dead.example": []}
+    resolver = Resolver("1")
+    resolver._lookup = make_lookup(answers)
+
+    assert asyncio.run(resolver.resolve("flaky.example")) == ([], [])
+    assert asyncio.run(resolver.resolve("dead.example")) == ([], [])
+    assert "flaky.example" not in resolver.cache
+    assert resolver.failed == {"flaky.example"}
+    assert resolver.cache["dead.example"] == ([], [])
+
+    answers["flaky.example"] = ["192.0.2.1"]
+    assert asyncio.run(resolver.resolve("flaky.example")) == (["192.0.2.1"], [])
+    assert not resolver.failed
+
+
+def test_unchanged_list_with_dead_domain_is_not_resolved_again(tmp_path):
+    hostlist = tmp_path / "hostlist-test.txt"
+    hostlist.write_text("ok.example\ndead.example\n")
+    calls = []
+    watcher = make_watcher(tmp_path, {"ok.example": ["192.0.2.1"], "dead.example": []}, calls)
+
+    asyncio.run(watcher.rebuild(str(hostlist)))
+    asyncio.run(watcher.rebuild(str(hostlist)))
+
+    assert sorted(calls) == ["dead.example", "ok.example"]
+
+
+def test_failed_domain_keeps_only_its_own_entries(tmp_path):
+    hostlist = tmp_path / "hostlist-test.txt"
+    output = tmp_path / "ips-ipv4-hostlist-test.txt"
+    hostlist.write_text("ok.example\nflaky.example\ngone.example\n")
+    answers = {"ok.example": ["192.0.2.1"], "flaky.example": ["198.51.100.7"], "gone.example": ["203.0.113.9"]}
+    asyncio.run(make_watcher(tmp_path, answers).rebuild(str(hostlist)))
+    assert output.read_text().splitlines() == ["192.0.2.1", "198.51.100.7", "203.0.113.9"]
+
+    # restart: flaky.example now fails and gone.example was deleted from the list
+    hostlist.write_text("ok.example\nflaky.example\n")
+    answers["flaky.example"] = None
+    watcher = make_watcher(tmp_path, answers)
+    assert asyncio.run(watcher.rebuild(str(hostlist))) == 1
+    assert output.read_text().splitlines() == ["192.0.2.1", "198.51.100.7"]
+
+    # the retry picks up the new answer even though the hostlist did not change
+    watcher.retry_paths.add(str(hostlist))
+    answers["flaky.example"] = ["198.51.100.8"]
+    assert asyncio.run(watcher.rebuild(str(hostlist))) == 0
+    assert output.read_text().splitlines() == ["192.0.2.1", "198.51.100.8"]
+
+
+def test_unknown_failed_domain_keeps_startup_entries(tmp_path):
+    hostlist = tmp_path / "hostlist-test.txt"
+    output = tmp_path / "ips-ipv4-hostlist-test.txt"
+    hostlist.write_text("ok.example\nflaky.example\n")
+    output.write_text("192.0.2.1\n198.51.100.7\n")
+    answers = {"ok.example": ["192.0.2.1"], "flaky.example": None}
+
+    watcher = make_watcher(tmp_path, answers)
+    asyncio.run(watcher.rebuild(str(hostlist)))
+    assert output.read_text().splitlines() == ["192.0.2.1", "198.51.100.7"]
+
+    answers["flaky.example"] = ["203.0.113.5"]
+    asyncio.run(watcher.rebuild_all([str(hostlist)]))
+    assert output.read_text().splitlines() == ["192.0.2.1", "203.0.113.5"]
@@ -0,0 +1,54 @@
+from prefixset import PrefixSet
+from windivert_filter import (
+    build_filter, combine, parse_filter, render, verify, count_tests, share_budget, split_ranges, ranges_node,
+    FILTER_MAXLEN
+)
+
+
+def test_exact_filter_roundtrip():
+    prefixes = PrefixSet(["192.0.2.0/24", "198.51.100.7", "2001:db8::/32"])
+    base = parse_filter("outbound and udp.DstPort >= 50000 and udp.DstPort <= 50100")
+
+    address_node, ranges, extra = build_filter(prefixes, base=base)
+    node = combine(base, address_node)
+
+    assert extra == {4: 0, 6: 0}
+    assert parse_filter(render(node)) == node
+    checked, missed, over = verify(address_node, ranges, samples=2000)
+    assert checked and not missed and not over
+
+
+def test_budget_reports_widening_per_family():
+    prefixes = PrefixSet([f"10.0.{i}.0/24" for i in range(0, 200, 2)])
+
+    address_node, ranges, extra = build_filter(prefixes, budget=10)
+
+    assert len(ranges[4]) == 10
+    assert extra[4] == 90 * 256 and extra[6] == 0
+    assert count_tests(address_node) <= FILTER_MAXLEN
+    assert verify(address_node, {4: prefixes.ranges(4)}, samples=2000)[1] == 0
+
+
+def test_budget_shares_never_exceed_budget():
+    assert share_budget({4: 100, 6: 1}, 10) == {4: 9, 6: 1}
+    assert share_budget({4: 5, 6: 5}, 5) in ({4: 3, 6: 2}, {4: 2, 6: 3})
+    assert share_budget({4: 3, 6: 0}, 10) == {4: 3, 6: 0}
+    for budget in range(2, 40):
+        assert sum(share_budget({4: 37, 6: 11}, budget).values()) == budget
+
+    prefixes = PrefixSet([f"10.{i}.0.0/16" for i in range(0, 100, 2)] + ["2001:db8::/48", "2001:db9::/48"])
+    _, ranges, _ = build_filter(prefixes, budget=5)
+    assert len(ranges[4]) + len(ranges[6]) == 5
+
+
+def test_split_filters_are_exact_and_fit():
+    prefixes = PrefixSet([f"10.0.{i}.1" for i in range(0, 250, 2)] + [f"10.1.{i}.0/24" for i in range(0, 250, 2)])
+
+    chunks = split_ranges(prefixes, 100)
+
+    assert len(chunks) > 1
+    assert sum(len(chunk[4]) for chunk in chunks) == len(prefixes.ranges(4))
+    for chunk in chunks:
+        node = ranges_node(chunk, "DstAddr")
+        assert count_tests(node) <= 100
+        assert verify(node, chunk, samples=500)[1:] == (0, 0)
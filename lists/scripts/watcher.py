@@ -0,0 +1,327 @@
+import os, sys, json, struct, fnmatch, logging
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from service import Service
+from resolver import Resolver
+from get_ipsets import fetch_cidrs, load_cache_from_disk, save_cache_to_disk, output_path
+from prefixset import PrefixSet, read_prefix_file
+
+
+WATCH_PATTERNS = ("list-*.txt", "hostlist-*.txt")
+WATCH_STATE_FILE = "watch_state.json"
+RETRY_INTERVAL = 60.0
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_watched(name: str) -> bool:
+    return any(fnmatch.fnmatch(name, pattern) for pattern in WATCH_PATTERNS)
+
+
+class InotifySource:
+    """
+    Linux inotify on a single directory via ctypes, reported through the asyncio loop.
+    """
+
+
+    def __init__(self, directory: str, on_change: Callable[[str], None]) -> None:
+        import ctypes, ctypes.util
+
+        self.directory = directory
+        self.on_change = on_change
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_MODIFY
+        if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+
+    def start(self) -> None:
+        asyncio.get_running_loop().add_reader(self.fd, self._read)
+
+
+    def stop(self) -> None:
+        asyncio.get_running_loop().remove_reader(self.fd)
+        os.close(self.fd)
+
+
+    def _read(self) -> None:
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            if name and is_watched(name):
+                self.on_change(os.path.join(self.directory, name))
+
+
+class PollingSource:
+    """
+    Fallback for platforms without inotify: compares (mtime, size) of watched files every interval.
+    """
+
+
+    def __init__(self, directory: str, on_change: Callable[[str], None], interval: float = 1.0) -> None:
+        self.directory = directory
+        self.on_change = on_change
+        self.interval = interval
+        self.task: Optional[asyncio.Task] = None
+        self.state = self._scan()
+
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.is_file() and is_watched(entry.name):
+                    stat = entry.stat()
+                    state[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            state = self._scan()
+            for path in set(state) | set(self.state):
+                if state.get(path) != self.state.get(path):
+                    self.on_change(path)
+            self.state = state
+
+
+    def start(self) -> None:
+        self.task = asyncio.create_task(self._loop())
+
+
+    def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+
+
+class IpsetWatcher:
+    """
+    Keeps ips-/ipset- outputs of every hostlist in a directory up to date.
+
+    The resolver, its cache, the CIDR cache and the RDAP session live for the whole run,
+    so an edit only costs lookups for the domains that were actually added (and for the
+    ones that had no answer yet).
+
+    The entries each domain produced last time are kept in WATCH_STATE_FILE. While a DNS
+    or RDAP lookup for a domain fails, those entries stay in the outputs (and only those,
+    so deleted domains still leave), and hostlists with failures are rebuilt every retry
+    seconds until the lookups succeed. A failed domain the state does not know yet keeps
+    the output's entries from startup, as the file alone does not tell whose they are.
+    """
+
+
+    def __init__(self, directory: str, ipv_mode: str, flag: str, cache_flag: bool = False,
+                 debounce: float = 1.0, interval: float = 1.0, retry: float = RETRY_INTERVAL,
+                 state_path: str = WATCH_STATE_FILE) -> None:
+        self.directory = os.path.abspath(directory)
+        self.ipv_mode = ipv_mode
+        self.flag = flag
+        self.cache_flag = cache_flag
+        self.debounce = debounce
+        self.interval = interval
+        self.resolver = Resolver(ipv_mode)
+        self.domains: Dict[str, Set[str]] = {}
+        self.cidr_cache: Dict[str, List[str]] = load_cache_from_disk() if cache_flag else {}
+        self.pending: Set[str] = set()
+        self.retry = retry
+        self.retry_paths: Set[str] = set()
+        self.state_path = state_path
+        self.last_good: Dict[str, List[str]] = self._load_state()
+        self.startup_outputs: Dict[str, PrefixSet] = {}
+        self.wakeup: Optional[asyncio.Event] = None
+        self.session = None
+
+
+    def __str__(self):
+        return f"IpsetWatcher({self.directory}, {len(self.domains)} lists)"
+
+
+    def notify(self, path: str) -> None:
+        self.pending.add(path)
+        self.wakeup.set()
+
+
+    def _load_state(self) -> Dict[str, List[str]]:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f).get(self.flag, {})
+        except (OSError, ValueError):
+            return {}
+
+
+    def _save_state(self) -> None:
+        state = {}
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            pass
+        listed = set().union(*self.domains.values())
+        state[self.flag] = {domain: entries for domain, entries in self.last_good.items() if domain in listed}
+        Service.write_atomic(self.state_path, [json.dumps(state, indent=2)])
+
+
+    def _read_domains(self, path: str) -> Set[str]:
+        try:
+            with open(path, "r", encoding="utf-8-sig") as f:
+                return {host.lower() for line in f for host in line.split() if not host.startswith("#")}
+        except FileNotFoundError:
+            return set()
+
+
+    async def rebuild(self, path: str) -> int:
+        """
+        Function, that re-resolves only the domains added to a hostlist (or still unresolved) and rewrites its outputs.
+
+        :return: Number of domains whose lookups failed (their last known entries were kept).
+        :rtype: int
+        """
+        current = self._read_domains(path)
+        previous = self.domains.get(path, set())
+        added, removed = current - previous, previous - current
+        unresolved = {domain for domain in current if domain not in self.resolver.cache}
+        self.domains[path] = current
+
+        if not added and not removed and not unresolved and previous and path not in self.retry_paths:
+            logging.debug(f"{os.path.basename(path)}: content unchanged.")
+            return 0
+
+        await asyncio.gather(*(self.resolver.resolve(domain) for domain in added | unresolved))
+
+        if self.flag == "cidrs":
+            ips = {ip for domain in current for ips in self.resolver.cache.get(domain, ([], [])) for ip in ips}
+            await asyncio.gather(*(fetch_cidrs(ip, self.session, self.cidr_cache) for ip in ips))
+            if self.cache_flag:
+                save_cache_to_disk(self.cidr_cache)
+
+        entries: Set[str] = set()
+        failed, unknown = 0, 0
+        for domain in sorted(current):
+            ipv4_list, ipv6_list = self.resolver.cache.get(domain, ([], []))
+            found = ipv4_list + ipv6_list
+            ok = domain not in self.resolver.failed
+            if self.flag == "cidrs":
+                # fetch_cidrs caches every answered lookup, so what is missing failed
+                ok = ok and all(f"cidr:{ip}" in self.cidr_cache for ip in found)
+                found = [cidr for ip in found for cidr in self.cidr_cache.get(f"cidr:{ip}", [])]
+
+            if ok:
+                self.last_good[domain] = found
+            else:
+                failed += 1
+                if domain in self.last_good:
+                    found = found + self.last_good[domain]
+                else:
+                    unknown += 1
+            entries.update(found)
+
+        kind = "ipset" if self.flag == "cidrs" else "ips"
+        found_set = PrefixSet(entries)
+        written = {}
+        for version in (4, 6):
+            if version == 4 and self.ipv_mode == "2" or version == 6 and self.ipv_mode == "1":
+                continue
+            target = output_path(path, kind, version)
+            if target not in self.startup_outputs:
+                self.startup_outputs[target] = (
+                    read_prefix_file(target, strict=False)[0].family(version) if os.path.exists(target) else PrefixSet()
+                )
+            prefixes = found_set.family(version)
+            if unknown:
+                prefixes = prefixes | self.startup_outputs[target]
+            if prefixes or os.path.exists(target):
+                Service.write_atomic(target, prefixes.lines(bare_hosts=kind == "ips"))
+            written[version] = len(prefixes)
+
+        self._save_state()
+
+        if failed:
+            logging.warning(
+                f"{os.path.basename(path)}: lookups for {failed} domain(s) failed, their last known entries "
+                f"are kept{' (the startup entries for ' + str(unknown) + ' new one(s))' if unknown else ''}; "
+                f"retrying in {self.retry:.0f}s."
+            )
+
+        logging.info(
+            f"{os.path.basename(path)}: +{len(added)} -{len(removed)} domain(s), "
+            f"{written.get(4, 0)} IPv4 / {written.get(6, 0)} IPv6 {kind} written."
+        )
+        return failed
+
+
+    async def rebuild_all(self, paths: Iterable[str]) -> None:
+        for path in sorted(paths):
+            try:
+                failed = await self.rebuild(path)
+            except OSError as e:
+                logging.error(f"Failed to rebuild {path}: {e}")
+                continue
+            if failed:
+                self.retry_paths.add(path)
+            else:
+                self.retry_paths.discard(path)
+
+
+    async def run(self) -> None:
+        import aiohttp
+
+        self.wakeup = asyncio.Event()
+
+        if sys.platform.startswith("linux"):
+            try:
+                source = InotifySource(self.directory, self.notify)
+            except OSError as e:
+                logging.warning(f"inotify unavailable ({e}), falling back to polling.")
+                source = PollingSource(self.directory, self.notify, self.interval)
+        else:
+            source = PollingSource(self.directory, self.notify, self.interval)
+
+        async with aiohttp.ClientSession() as self.session:
+            initial = sorted(
+                entry.path for entry in os.scandir(self.directory) if entry.is_file() and is_watched(entry.name)
+            )
+            await self.rebuild_all(initial)
+
+            source.start()
+            logging.info(f"Watching {self.directory} ({type(source).__name__}), Ctrl-C to stop.")
+
+            try:
+                while True:
+                    try:
+                        # hostlists with failed lookups are rebuilt on a timer, not only on edits
+                        await asyncio.wait_for(self.wakeup.wait(), self.retry if self.retry_paths else None)
+                    except asyncio.TimeoutError:
+                        self.pending |= self.retry_paths
+                    else:
+                        # debounce: wait until no new events arrive for self.debounce seconds
+                        while True:
+                            self.wakeup.clear()
+                            try:
+                                await asyncio.wait_for(self.wakeup.wait(), self.debounce)
+                            except asyncio.TimeoutError:
+                                break
+
+                    changed, self.pending = self.pending, set()
+                    await self.rebuild_all(changed)
+            finally:
+                source.stop()
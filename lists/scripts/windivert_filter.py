@@ -0,0 +1,556 @@
+import os, re, heapq, random, socket, logging
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from service import Service
+from prefixset import PrefixSet, read_prefix_file
+
+
+# WinDivert rejects filters that compile to more than this many instructions
+FILTER_MAXLEN = 256
+# widening the ipset by more than this (relative to its size) needs --widen
+MAX_EXTRA_RATIO = 0.1
+
+FIELDS = {4: "ip", 6: "ipv6"}
+
+Node = Tuple
+Packet = Dict[str, Union[bool, int]]
+
+
+def format_address(version: int, value: int) -> str:
+    if version == 4:
+        return socket.inet_ntop(socket.AF_INET, value.to_bytes(4, "big"))
+    return socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, "big"))
+
+
+def merge_ranges(ranges: List[Tuple[int, int]], budget: int) -> Tuple[List[Tuple[int, int]], int]:
+    """
+    Function, that closes the smallest gaps between ranges until at most budget ranges remain.
+
+    :param ranges: Sorted disjoint ranges.
+    :type ranges: List[Tuple[int, int]]
+    :param budget: Max number of ranges.
+    :type budget: int
+    :return: Merged ranges and the number of extra addresses they now cover.
+    :rtype: Tuple[List[Tuple[int, int]], int]
+    """
+    if len(ranges) <= budget:
+        return ranges, 0
+
+    gaps = [(ranges[i + 1][0] - ranges[i][1] - 1, i) for i in range(len(ranges) - 1)]
+    closed = {i for _, i in heapq.nsmallest(len(ranges) - max(budget, 1), gaps)}
+
+    merged, extra = [], 0
+    for i, (first, last) in enumerate(ranges):
+        if merged and i - 1 in closed:
+            extra += first - merged[-1][1] - 1
+            merged[-1] = (merged[-1][0], last)
+        else:
+            merged.append((first, last))
+    return merged, extra
+
+
+def range_node(version: int, field: str, first: int, last: int) -> Node:
+    name = f"{FIELDS[version]}.{field}"
+    if first == last:
+        return ("cmp", name, None, "=", first)
+    return ("and", ("cmp", name, None, ">=", first), ("cmp", name, None, "<=", last))
+
+
+def weighted_or(items: List[Tuple[int, Node]]) -> Optional[Node]:
+    """
+    Builds the 'or' tree like a Huffman code: the two lightest subtrees are joined first,
+    so the widest ranges end up closest to the root and are tested first.
+    """
+    if not items:
+        return None
+    heap = [(weight, order, node) for order, (weight, node) in enumerate(items)]
+    heapq.heapify(heap)
+    order = len(heap)
+    while len(heap) > 1:
+        light_weight, _, light = heapq.heappop(heap)
+        heavy_weight, _, heavy = heapq.heappop(heap)
+        heapq.heappush(heap, (light_weight + heavy_weight, order, ("or", heavy, light)))
+        order += 1
+    return heap[0][2]
+
+
+TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<op>&&|\|\||==|!=|<=|>=|<|>|=|!|&|\(|\))
+      | (?P<ipv6>(?:[0-9A-Fa-f]{0,4}:){2,7}[0-9A-Fa-f.]*)
+      | (?P<ipv4>\d+\.\d+\.\d+\.\d+)
+      | (?P<hex>0[xX][0-9A-Fa-f]+)
+      | (?P<dec>\d+)
+      | (?P<word>[A-Za-z_][A-Za-z0-9_.]*(?:\[-?\d+\])?)
+    )""", re.VERBOSE)
+
+COMPARISONS = ("=", "==", "!=", "<", "<=", ">", ">=")
+
+
+def tokenize(text: str) -> List[Tuple[str, Union[str, int]]]:
+    tokens, position = [], 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise ValueError(f"Unexpected character in filter at {position}: '{text[position:position + 10]}'")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "ipv6":
+            tokens.append(("num", int.from_bytes(socket.inet_pton(socket.AF_INET6, value), "big")))
+        elif kind == "ipv4":
+            tokens.append(("num", int.from_bytes(socket.inet_pton(socket.AF_INET, value), "big")))
+        elif kind in ("hex", "dec"):
+            tokens.append(("num", int(value, 0)))
+        elif kind == "word" and value.lower() in ("and", "or", "not"):
+            tokens.append(("op", {"and": "&&", "or": "||", "not": "!"}[value.lower()]))
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+def parse_filter(text: str) -> Node:
+    """
+    Function, that parses the WinDivert filter subset used in lists/windiwert.filter/:
+    and/or/not (&&, ||, !), parentheses, bare fields, comparisons and 'field & mask = value'.
+
+    :param text: Filter expression.
+    :type text: str
+    :return: Syntax tree of ('or' | 'and', a, b), ('not', a), ('field', name), ('const', bool)
+             and ('cmp', field, mask, op, value) nodes.
+    :rtype: Node
+    """
+    tokens = tokenize(text)
+    position = 0
+
+    def peek() -> Tuple[str, Union[str, int, None]]:
+        return tokens[position] if position < len(tokens) else ("end", None)
+
+    def take(expected: Optional[str] = None) -> Tuple[str, Union[str, int, None]]:
+        nonlocal position
+        token = peek()
+        if expected is not None and token[1] != expected:
+            raise ValueError(f"Expected '{expected}' in filter, got '{token[1]}'")
+        position += 1
+        return token
+
+    def parse_or() -> Node:
+        node = parse_and()
+        while peek() == ("op", "||"):
+            take()
+            node = ("or", node, parse_and())
+        return node
+
+    def parse_and() -> Node:
+        node = parse_not()
+        while peek() == ("op", "&&"):
+            take()
+            node = ("and", node, parse_not())
+        return node
+
+    def parse_not() -> Node:
+        if peek() == ("op", "!"):
+            take()
+            return ("not", parse_not())
+        if peek() == ("op", "("):
+            take()
+            node = parse_or()
+            take(")")
+            return node
+        return parse_test()
+
+    def parse_test() -> Node:
+        kind, name = take()
+        if kind != "word":
+            raise ValueError(f"Expected a field in filter, got '{name}'")
+        if name.lower() in ("true", "false"):
+            return ("const", name.lower() == "true")
+
+        mask = None
+        if peek() == ("op", "&"):
+            take()
+            kind, mask = take()
+            if kind != "num":
+                raise ValueError(f"Expected a mask after '&', got '{mask}'")
+
+        if peek()[0] == "op" and peek()[1] in COMPARISONS:
+            op = take()[1]
+            kind, value = take()
+            if kind != "num":
+                raise ValueError(f"Expected a value after '{name} {op}', got '{value}'")
+            return ("cmp", name, mask, "=" if op == "==" else op, value)
+
+        if mask is not None:
+            raise ValueError(f"Masked field '{name}' needs a comparison")
+        return ("field", name)
+
+    node = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected '{peek()[1]}' in filter")
+    return node
+
+
+def evaluate(node: Node, packet: Packet) -> bool:
+    """
+    Evaluates a parsed filter on a packet, given as field name -> value ('ip': True, 'ip.DstAddr': ...).
+    A missing field makes its test false, like a missing protocol layer in WinDivert.
+    """
+    kind = node[0]
+    if kind == "or":
+        return evaluate(node[1], packet) or evaluate(node[2], packet)
+    if kind == "and":
+        return evaluate(node[1], packet) and evaluate(node[2], packet)
+    if kind == "not":
+        return not evaluate(node[1], packet)
+    if kind == "const":
+        return node[1]
+    if kind == "field":
+        return bool(packet.get(node[1], False))
+
+    _, name, mask, op, value = node
+    if name not in packet:
+        return False
+    actual = packet[name] & mask if mask is not None else packet[name]
+    return {
+        "=": actual == value, "!=": actual != value, "<": actual < value,
+        "<=": actual <= value, ">": actual > value, ">=": actual >= value,
+    }[op]
+
+
+def render(node: Node) -> str:
+    """
+    Turns a syntax tree back into filter text that parses to the same tree.
+    """
+    def child(sub: Node, parent: str, right: bool) -> str:
+        text = render(sub)
+        if sub[0] in ("or", "and") and (
+            parent == "not" or sub[0] != parent and sub[0] != "and" or sub[0] == parent and right or
+            sub[0] == "and" and parent == "or"
+        ):
+            return f"({text})"
+        return text
+
+    kind = node[0]
+    if kind in ("or", "and"):
+        return f"{child(node[1], kind, False)} {kind} {child(node[2], kind, True)}"
+    if kind == "not":
+        return f"not {child(node[1], 'not', False)}"
+    if kind == "const":
+        return "true" if node[1] else "false"
+    if kind == "field":
+        return node[1]
+
+    _, name, mask, op, value = node
+    if name.endswith("Addr"):
+        text = format_address(6 if name.startswith("ipv6") else 4, value)
+    else:
+        text = hex(value) if mask is not None or "Payload" in name and "Length" not in name else str(value)
+    masked = f"{name} & {hex(mask)}" if mask is not None else name
+    return f"{masked} {op} {text}"
+
+
+def count_tests(node: Node) -> int:
+    if node[0] in ("or", "and"):
+        return count_tests(node[1]) + count_tests(node[2])
+    if node[0] == "not":
+        return count_tests(node[1])
+    return 1
+
+
+def and_chain(node: Node) -> List[Node]:
+    if node[0] == "and":
+        return and_chain(node[1]) + and_chain(node[2])
+    return [node]
+
+
+def uses_payload(node: Node) -> bool:
+    if node[0] in ("or", "and"):
+        return uses_payload(node[1]) or uses_payload(node[2])
+    if node[0] == "not":
+        return uses_payload(node[1])
+    return node[0] in ("cmp", "field") and "Payload" in node[1] and "PayloadLength" not in node[1]
+
+
+def combine(base: Optional[Node], address_node: Node) -> Node:
+    """
+    Inserts the address test into the base filter's top-level 'and' chain, after the header
+    tests (protocol, ports, lengths) and before the payload tests, so payload bytes are only
+    inspected for packets to listed addresses.
+    """
+    if base is None:
+        return address_node
+
+    terms = and_chain(base)
+    header = [term for term in terms if not uses_payload(term)]
+    payload = [term for term in terms if uses_payload(term)]
+
+    node = None
+    for term in header + [address_node] + payload:
+        node = term if node is None else ("and", node, term)
+    return node
+
+
+Ranges = Dict[int, List[Tuple[int, int]]]
+
+
+def share_budget(counts: Dict[int, int], budget: int) -> Dict[int, int]:
+    """
+    Splits budget between IP versions in proportion to their range counts by largest
+    remainder, so the shares add up to exactly budget and every present version gets one.
+    """
+    total = sum(counts.values())
+    present = [version for version in counts if counts[version]]
+    if budget >= total:
+        return dict(counts)
+    if budget < len(present):
+        raise ValueError(f"A budget of {budget} range(s) cannot cover {len(present)} IP versions.")
+
+    shares = {version: budget * counts[version] // total for version in counts}
+    by_remainder = sorted(present, key=lambda version: budget * counts[version] % total, reverse=True)
+    for version in by_remainder[:budget - sum(shares.values())]:
+        shares[version] += 1
+
+    for version in present:
+        if not shares[version]:
+            donor = max(present, key=lambda other: shares[other])
+            shares[donor] -= 1
+            shares[version] = 1
+    return shares
+
+
+def ranges_node(ranges: Ranges, field: str = "DstAddr") -> Node:
+    """
+    Address test matching any of the ranges, IPv4 or IPv6.
+    """
+    families = []
+    for version in (4, 6):
+        items = [(last - first + 1, range_node(version, field, first, last)) for first, last in ranges.get(version, [])]
+        if items:
+            families.append(weighted_or(items))
+    return families[0] if len(families) == 1 else ("or", families[0], families[1])
+
+
+def build_filter(prefixes: PrefixSet, field: str = "DstAddr", budget: Optional[int] = None,
+                 base: Optional[Node] = None) -> Tuple[Node, Ranges, Dict[int, int]]:
+    """
+    Function, that compiles an ipset into a WinDivert address test.
+
+    :param prefixes: Source ipset.
+    :type prefixes: PrefixSet
+    :param field: 'DstAddr' or 'SrcAddr'.
+    :type field: str
+    :param budget: Max number of address ranges, None to fit FILTER_MAXLEN.
+    :type budget: int | None
+    :param base: Parsed base filter the test will be combined with; only used to size the default budget.
+    :type base: Node | None
+    :return: Address test, ranges and extra addresses matched because of the budget, per IP version.
+    :rtype: Tuple[Node, Dict[int, List[Tuple[int, int]]], Dict[int, int]]
+    """
+    ranges = {version: prefixes.ranges(version) for version in (4, 6)}
+    if not any(ranges.values()):
+        raise ValueError("The ipset has no entries.")
+
+    if budget is None:
+        budget = max(1, (FILTER_MAXLEN - (count_tests(base) if base else 0)) // 2)
+
+    shares = share_budget({version: len(items) for version, items in ranges.items()}, budget)
+    extra = {4: 0, 6: 0}
+    for version in (4, 6):
+        if ranges[version]:
+            ranges[version], extra[version] = merge_ranges(ranges[version], shares[version])
+
+    return ranges_node(ranges, field), ranges, extra
+
+
+def split_ranges(prefixes: PrefixSet, capacity: int) -> List[Ranges]:
+    """
+    Function, that cuts an ipset into exact address tests of at most capacity tests each.
+
+    A single address costs one test, a range two; the 'or' joins are free. Ranges are
+    taken in address order, so every filter covers a contiguous part of the ipset.
+
+    :param prefixes: Source ipset.
+    :type prefixes: PrefixSet
+    :param capacity: Tests available per filter (FILTER_MAXLEN minus the base filter's tests).
+    :type capacity: int
+    :return: Ranges per IP version, one dict per filter.
+    :rtype: List[Dict[int, List[Tuple[int, int]]]]
+    """
+    if capacity < 2:
+        raise ValueError("The base filter leaves no room for an address test.")
+
+    chunks: List[Ranges] = []
+    used = capacity
+    for version in (4, 6):
+        for first, last in prefixes.ranges(version):
+            cost = 1 if first == last else 2
+            if used + cost > capacity:
+                chunks.append({4: [], 6: []})
+                used = 0
+            chunks[-1][version].append((first, last))
+            used += cost
+    return chunks
+
+
+def sample_addresses(ranges: List[Tuple[int, int]], bits: int, count: int, rng: random.Random) -> Iterator[int]:
+    """
+    Range edges and their neighbours first, then random addresses inside ranges and anywhere.
+    """
+    top = (1 << bits) - 1
+    samples = []
+    for first, last in ranges:
+        samples += [first, last, max(first - 1, 0), min(last + 1, top)]
+    rng.shuffle(samples)
+    yield from samples[:count // 2]
+
+    for i in range(count - min(len(samples), count // 2)):
+        if i % 2 and ranges:
+            first, last = rng.choice(ranges)
+            yield rng.randint(first, last)
+        else:
+            yield rng.getrandbits(bits)
+
+
+def verify(address_node: Node, exact: Ranges, field: str = "DstAddr", samples: int = 10000,
+           seed: int = 0) -> Tuple[int, int, int]:
+    """
+    Function, that checks the generated address test against the exact source ranges
+    (PrefixSet.ranges per IP version) with the local evaluator.
+
+    :return: (addresses checked, listed addresses the filter misses, unlisted addresses it matches).
+    :rtype: Tuple[int, int, int]
+    """
+    rng = random.Random(seed)
+    checked = missed = extra = 0
+
+    for version, bits in ((4, 32), (6, 128)):
+        listed = exact.get(version, [])
+        if not listed:
+            continue
+        starts = [first for first, _ in listed]
+
+        for address in sample_addresses(listed, bits, samples, rng):
+            position = bisect_right(starts, address) - 1
+            expected = position >= 0 and address <= listed[position][1]
+            packet = {FIELDS[version]: True, f"{FIELDS[version]}.{field}": address}
+            actual = evaluate(address_node, packet)
+            checked += 1
+            if expected and not actual:
+                missed += 1
+                logging.error(f"Filter misses listed address {format_address(version, address)}")
+            elif actual and not expected:
+                extra += 1
+
+    return checked, missed, extra
+
+
+def check_filter(node: Node, address_node: Node, exact: Ranges, field: str, samples: int, widened: bool) -> str:
+    """
+    Function, that renders a combined filter and refuses it if WinDivert could not load it
+    or it does not match the ipset.
+
+    :return: Filter text.
+    :rtype: str
+    """
+    text = render(node)
+    tests = count_tests(node)
+    if tests > FILTER_MAXLEN:
+        logging.error(f"{tests} tests exceed WinDivert's {FILTER_MAXLEN}-instruction limit, lower --budget or use --split.")
+        raise SystemExit(1)
+
+    if parse_filter(text) != node:
+        raise SystemExit("Rendered filter does not parse back to the same expression.")
+
+    checked, missed, over = verify(address_node, exact, field, samples)
+    logging.info(f"Verified on {checked} sample address(es): {missed} missed, {over} matched outside the ipset.")
+    if missed or (over and not widened):
+        raise SystemExit(1)
+    return text
+
+
+def numbered_path(path: str, number: int) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}-{number}{ext}"
+
+
+def main() -> None:
+    service = Service("windivert")
+    Service.setup_logging()
+    args = service.argparse().parse_args()
+
+    prefixes, _, _ = read_prefix_file(Service.find_file(args.filename), strict=False)
+    exact = {version: prefixes.ranges(version) for version in (4, 6)}
+
+    base = None
+    if args.base:
+        base_path = args.base
+        if not os.path.isfile(base_path):
+            base_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "windiwert.filter", args.base)
+        with open(base_path, "r", encoding="utf-8") as f:
+            base = parse_filter(f.read())
+
+    field = "SrcAddr" if args.source else "DstAddr"
+    capacity = FILTER_MAXLEN - (count_tests(base) if base else 0)
+
+    if args.split:
+        chunks = split_ranges(prefixes, capacity)
+        texts = []
+        for chunk in chunks:
+            address_node = ranges_node(chunk, field)
+            texts.append(check_filter(combine(base, address_node), address_node, chunk, field, args.samples, False))
+        logging.info(
+            f"{len(prefixes)} prefix(es) -> {len(exact[4])} IPv4 / {len(exact[6])} IPv6 range(s) "
+            f"in {len(texts)} exact filter(s), one winws instance each."
+        )
+
+        if args.output:
+            for number, text in enumerate(texts, 1):
+                Service.write_atomic(numbered_path(args.output, number), [text])
+            logging.info(f"Filters written to {numbered_path(args.output, 1)} .. {numbered_path(args.output, len(texts))}")
+        else:
+            print("\n\n".join(texts))
+        return
+
+    address_node, ranges, extra = build_filter(prefixes, field, args.budget, base)
+    node = combine(base, address_node)
+    logging.info(
+        f"{len(prefixes)} prefix(es) -> {len(ranges[4])} IPv4 / {len(ranges[6])} IPv6 range(s), "
+        f"{count_tests(node)} test(s), {sum(extra.values())} extra address(es) matched because of the budget."
+    )
+
+    too_wide = False
+    for version in (4, 6):
+        if not extra[version]:
+            continue
+        listed = sum(last - first + 1 for first, last in exact[version])
+        ratio = extra[version] / listed
+        message = (
+            f"The IPv{version} ipset ({len(exact[version])} exact range(s)) does not fit in {len(ranges[version])}: "
+            f"closing gaps makes the filter match {extra[version]} address(es) outside it, {ratio:.1%} of the {listed} listed."
+        )
+        if ratio > MAX_EXTRA_RATIO and not args.widen:
+            logging.error(message)
+            too_wide = True
+        elif args.budget is None or ratio > MAX_EXTRA_RATIO:
+            logging.warning(message)
+        else:
+            logging.info(message)
+
+    if too_wide:
+        filters = len(split_ranges(prefixes, capacity))
+        logging.error(
+            f"Use --split to write {filters} exact filter(s) instead, or --widen to accept the widened filter."
+        )
+        raise SystemExit(1)
+
+    text = check_filter(node, address_node, exact, field, args.samples, any(extra.values()))
+    if args.output:
+        Service.write_atomic(args.output, [text])
+        logging.info(f"Filter written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()